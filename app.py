@@ -1,38 +1,320 @@
 #!/usr/bin/python
 import os
 import json
-from flask import Flask, request, abort, jsonify
+import base64
+import hashlib
+from flask import Flask, Response, current_app, request, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from database.models import setup_db, Student, Mentor, MentorCourse, MentorStudentPair, Feedback, RequestMessage, ReplyMessage, AdminMessage
-from sqlalchemy import exc, func
+from database.models import setup_db, db, TEXT_SEARCH_CONFIG, Student, Mentor, MentorCourse, MentorAvailability, CourseCatalog, MentorStudentPair, Feedback, RequestMessage, ReplyMessage, AdminMessage
+from database.search_index import mentor_search_index, IndexedMentor, IndexedCourse
+from database.search_cache import search_result_cache
+from database.course_catalog import course_catalog_snapshot
+from database.geo import geocode, covering_cells, distance_km
+from database.availability import parse_slot, parse_availability
+from sqlalchemy import exc, func, or_, and_, case, select, literal, union_all, cast, Numeric
+from sqlalchemy.orm import joinedload
 
-from auth_0.auth import AuthError, requires_auth
+from auth_0.auth import AuthError, requires_auth, auth_metrics
 
 
 ################HELPER FUCNTIONS ############################
 
-def op_format(mentor_output_list):
+def op_format(mentor_output_list, ratings=None):
   return_list = []
+  if ratings is None:
+    ratings = mentor_ratings([op_list.mentor_id for op_list in mentor_output_list])
 
   for op_list in mentor_output_list:
+    rating, review_count = ratings.get(op_list.mentor_id, (0, 0))
 
     return_list.append({
       'mentor_id': op_list.mentor_id,
       'time_available':op_list.time_available,
       'course_id':op_list.course_id,
-      'course_name':op_list.course_name      
+      'course_name':op_list.course_name,
+      'rating':rating,
+      'review_count':review_count
     })
 
   return return_list
 
-def return_rating(mentor_id):
+'''
+student_course_format(row): mentorship pair of a student with the names of its mentor and course, row is a
+(MentorStudentPair, mentor_name, course_name, course_grade) result of the GET /student_access query
+'''
+def student_course_format(row):
+  student_course = row.MentorStudentPair.format()
+  student_course['mentor_name'] = row.mentor_name
+  student_course['course_name'] = row.course_name
+  student_course['grade'] = row.course_grade
+  return student_course
 
-  mentor_feedback = Feedback.query.with_entities(func.avg(Feedback.rating)).filter(Feedback.mentor_id==mentor_id).all()
-  if mentor_feedback[0][0]==None:
-    return 0
+'''
+Rating helpers: the average rating and the number of reviews of a mentor come from the rating_sum and rating_count
+columns of the mentors table, which are maintained on every feedback write. Mentors without feedback have rating 0 like in Mentor.average_rating().
+The average is rounded to RATING_DECIMALS so that the value shown, the sort key and the pagination cursor are the same number.
+'''
+RATING_DECIMALS = 2
+## Maximum number of mentor ids of one POST /student_access/mentor_ratings request
+RATINGS_MAX_MENTORS = 300
+## ts_rank relevance of the full-text search mode is rounded the same way for its pagination cursor
+RELEVANCE_DECIMALS = 4
+
+def mentor_rating():
+  return case([(Mentor.rating_count > 0, func.round(cast(Mentor.rating_sum, Numeric) / Mentor.rating_count, RATING_DECIMALS))], else_=0)
+
+def mentor_ratings(mentor_ids):
+  mentor_ids = set(mentor_ids)
+  if not mentor_ids:
+    return {}
+  rating_rows = ( Mentor.query
+                        .with_entities(Mentor.userid.label('mentor_id'), mentor_rating().label('rating'), Mentor.rating_count.label('review_count'))
+                        .filter(Mentor.userid.in_(mentor_ids))
+                        .all()
+                )
+  return {row.mentor_id: (float(row.rating), row.review_count) for row in rating_rows}
+
+'''
+Pagination helpers: search results are paginated with keyset (seek) pagination. The cursor handed to the client
+is an opaque url safe string holding the sort key of the last row of the previous page.
+'''
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+
+def encode_cursor(values):
+  return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+  try:
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+  except Exception:
+    raise invalidInputError
+  if not isinstance(values, list):
+    raise invalidInputError
+  return values
+
+def read_limit(limit, default_limit, max_limit):
+  if limit is None:
+    return default_limit
+  if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+    raise invalidInputError
+  return min(limit, max_limit)
+
+'''
+Dashboard pagination: the feedbacks, current students and previous students of GET /mentor_access are paged separately
+with the optional query parameters <section>_limit and <section>_cursor, the cursor holds the id of the last row shown.
+Every section reads at most limit+1 rows from its (mentor_id, ..., id) index, however long the mentor's history is.
+'''
+DASHBOARD_DEFAULT_LIMIT = 50
+DASHBOARD_MAX_LIMIT = 200
+DASHBOARD_SECTIONS = ('feedbacks', 'current_students', 'previous_students')
+
+'''
+read_int_arg(name): reads an optional integer query parameter, None if it is not given
+'''
+def read_int_arg(name):
+  value = request.args.get(name)
+  if value is None:
+    return None
+  try:
+    return int(value)
+  except ValueError:
+    raise invalidInputError
+
+def read_section_page(section):
+  limit = read_limit(read_int_arg(section + '_limit'), DASHBOARD_DEFAULT_LIMIT, DASHBOARD_MAX_LIMIT)
+
+  after_id = None
+  cursor = request.args.get(section + '_cursor')
+  if cursor is not None:
+    cursor_values = decode_cursor(cursor)
+    if len(cursor_values)!=1 or isinstance(cursor_values[0], bool) or not isinstance(cursor_values[0], int):
+      raise invalidInputError
+    after_id = cursor_values[0]
+  return limit, after_id
+
+def section_page(rows, limit):
+  next_cursor = encode_cursor([rows[limit-1].id]) if len(rows) > limit else None
+  return rows[:limit], next_cursor
+
+'''
+Inbox pagination: GET /student_access/reply_messages and GET /mentor_access/request_messages return the newest messages
+first, a page at a time. The optional query parameter before_id takes the next_before_id of the previous page and
+limit the page size, a page is a range scan of the (student_id, id DESC) or (mentor_id, id DESC) index.
+Polling clients pass since_id instead, the high_water_mark of their last response, and only get the messages that
+arrived after it, oldest first, so a poll costs a range scan over the new messages only.
+'''
+INBOX_DEFAULT_LIMIT = 50
+INBOX_MAX_LIMIT = 200
+
+'''
+inbox_page(query, id_column): page of a message query selected by the before_id, since_id and limit query parameters,
+returns the messages and the paging fields of the response: next_before_id of the following page (None on the last page)
+and high_water_mark, or in since_id mode high_water_mark and has_more (more new messages than limit arrived)
+'''
+def inbox_page(query, id_column):
+  limit = read_limit(read_int_arg('limit'), INBOX_DEFAULT_LIMIT, INBOX_MAX_LIMIT)
+  before_id = read_int_arg('before_id')
+  since_id = read_int_arg('since_id')
+  if before_id is not None and since_id is not None:
+    raise invalidInputError
+
+  if since_id is not None:
+    messages = query.filter(id_column > since_id).order_by(id_column).limit(limit+1).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    return messages, {
+      'high_water_mark' : messages[-1].id if messages else since_id,
+      'has_more'        : has_more
+    }
+
+  if before_id is not None:
+    query = query.filter(id_column < before_id)
+  messages = query.order_by(id_column.desc()).limit(limit+1).all()
+  next_before_id = messages[limit-1].id if len(messages) > limit else None
+  messages = messages[:limit]
+  # the newest message of the inbox is only known on the first page
+  high_water_mark = (messages[0].id if messages else 0) if before_id is None else None
+  return messages, {
+    'next_before_id'  : next_before_id,
+    'high_water_mark' : high_water_mark
+  }
+
+'''
+load_search_index(app): reads the columns the mentor search index needs as plain rows, streamed in batches of
+SEARCH_INDEX_LOAD_BATCH rows, runs in the rebuild thread of the index with its own application context and session
+'''
+SEARCH_INDEX_LOAD_BATCH = 10000
+
+def load_search_index(app):
+  with app.app_context():
+    mentor_courses = {}
+    course_rows = MentorCourse.query.with_entities(MentorCourse.id, MentorCourse.mentor_id, MentorCourse.name, MentorCourse.grade)
+    for course in course_rows.yield_per(SEARCH_INDEX_LOAD_BATCH):
+      mentor_courses.setdefault(course.mentor_id, []).append(IndexedCourse(course.id, course.mentor_id, course.name, course.grade))
+    mentor_rows = Mentor.query.with_entities(Mentor.userid, Mentor.city, Mentor.state, Mentor.avail_time)
+    return [IndexedMentor(mentor.userid, mentor.city, mentor.state, mentor.avail_time, mentor_courses.get(mentor.userid, ()))
+            for mentor in mentor_rows.yield_per(SEARCH_INDEX_LOAD_BATCH)]
+
+'''
+indexed_search(): answers a mentor search from the in-memory mentor_search_index. If the index is not built yet or
+too old a single background rebuild is started, requests keep using the old index meanwhile. It returns None if the
+index is disabled, not built yet or can not answer the query, the caller then runs the SQL query.
+'''
+def indexed_search(course_name, city, state, grade, after_course_id, limit):
+  if not mentor_search_index.enabled:
+    return None
+  if mentor_search_index.needs_rebuild():
+    app = current_app._get_current_object()
+    mentor_search_index.rebuild_in_background(lambda: load_search_index(app))
+  return mentor_search_index.search(course_name, city, state, grade, after_course_id, limit)
+
+'''
+batch_sql_search(): runs several searches of one location as a single SQL statement. Every search is a branch of a
+UNION ALL tagged with its query_index and ordered and limited on its own, so each branch stops after its first limit rows.
+queries is a list of (query_index, course_name, grade), the rows are returned grouped by query_index and ordered by course id.
+'''
+BATCH_MAX_QUERIES = 20
+
+def batch_sql_search(city, state, queries, limit):
+  branches = [ select([literal(query_index).label('query_index'),Mentor.userid.label('mentor_id'),Mentor.avail_time.label('time_available'),MentorCourse.name.label('course_name'),MentorCourse.id.label('course_id')])
+                      .select_from(Mentor.__table__.join(MentorCourse.__table__, Mentor.userid==MentorCourse.mentor_id))
+                      .where(and_(func.lower(Mentor.city)==func.lower(city), func.lower(Mentor.state)==func.lower(state), MentorCourse.grade==grade, func.lower(MentorCourse.name).like('%'+func.lower(course_name)+'%')))
+                      .order_by(MentorCourse.id).limit(limit)
+               for query_index, course_name, grade in queries ]
+  batch = union_all(*branches).alias('batch')
+  rows = db.session.execute(select([batch]).order_by(batch.c.query_index, batch.c.course_id)).fetchall()
+
+  grouped_rows = {query_index: [] for query_index, course_name, grade in queries}
+  for row in rows:
+    grouped_rows[row.query_index].append(row)
+  return grouped_rows
+
+'''
+Proximity search helpers: the search radius is given in kilometers
+'''
+NEARBY_DEFAULT_RADIUS_KM = 25
+NEARBY_MAX_RADIUS_KM = 100
+
+def read_radius(radius_km):
+  if radius_km is None:
+    return NEARBY_DEFAULT_RADIUS_KM
+  if isinstance(radius_km, bool) or not isinstance(radius_km, (int, float)) or radius_km <= 0:
+    raise invalidInputError
+  return min(radius_km, NEARBY_MAX_RADIUS_KM)
+
+def nearby_format(nearby_rows, ratings=None):
+  return_list = op_format([row for distance, row in nearby_rows], ratings)
+  for output, (distance, row) in zip(return_list, nearby_rows):
+    output['distance_km'] = None if distance is None else round(distance, 1)
+  return return_list
+
+'''
+Availability helpers: a search can be restricted to mentors available for a whole time slot such as "Tue 16:00-18:00".
+The filter is a containment test against the stored weekday intervals, served by ix_mentor_availabilities_day_start_end.
+'''
+def read_slot(slot):
+  if slot is None:
+    return None
+  try:
+    day_of_week, start_minute, end_minute = parse_slot(slot)
+  except ValueError:
+    raise invalidInputError
+  if end_minute <= start_minute:
+    raise invalidInputError
+  return day_of_week, start_minute, end_minute
+
+def availability_filter(slot):
+  day_of_week, start_minute, end_minute = slot
+  return Mentor.availability.any(and_(MentorAvailability.day_of_week==day_of_week, MentorAvailability.start_minute<=start_minute, MentorAvailability.end_minute>=end_minute))
+
+'''
+load_course_catalog(): reads the distinct courses from the course_catalog table, highest grade first
+'''
+def load_course_catalog():
+  return [course.format() for course in CourseCatalog.query.order_by(CourseCatalog.grade.desc(), CourseCatalog.name).all()]
+
+'''
+Conditional GET: the public catalog may be cached by browsers and proxies for COURSES_MAX_AGE seconds, profiles are
+private and revalidated on every use. A request whose If-None-Match lists the current ETag gets an empty 304.
+'''
+COURSES_MAX_AGE = int(os.getenv('COURSES_MAX_AGE', 30))
+COURSES_CACHE_CONTROL = 'public, max-age={}'.format(COURSES_MAX_AGE)
+PROFILE_CACHE_CONTROL = 'private, no-cache'
+
+'''
+mentor_version(mentor_id): reads only the version column of a mentor, None if the mentor does not exist
+'''
+def mentor_version(mentor_id):
+  return db.session.query(Mentor.version).filter(Mentor.userid==mentor_id).scalar()
+
+'''
+profile_etag(view, mentor_id, version, params): ETag value of one view of a mentor profile at a version,
+params are the query parameters that select the part of the profile shown
+'''
+def profile_etag(view, mentor_id, version, params=None):
+  return hashlib.sha1(json.dumps([view, mentor_id, version, params]).encode('utf-8')).hexdigest()
+
+'''
+is_not_modified(etag): True if the client already has the representation with this ETag
+'''
+def is_not_modified(etag):
+  return etag is not None and request.if_none_match.contains_weak(etag)
+
+'''
+with_validators(response, etag, cache_control): sets the ETag and Cache-Control headers of a response,
+not_modified(etag, cache_control) builds the 304 response
+'''
+def with_validators(response, etag, cache_control):
+  if etag is not None:
+    response.set_etag(etag)
+  response.headers['Cache-Control'] = cache_control
+  return response
+
+def not_modified(etag, cache_control):
+  return with_validators(Response(status=304), etag, cache_control)
 
-  return float(mentor_feedback[0][0])
 
 ###################ERROR HANDLING PART1 ######################
 
@@ -60,6 +342,10 @@ class actionNotPermittedError(Error):
   """ Raised if someone other than student attempts to give feedback"""
   pass
 
+class invalidInputError(Error):
+  """ Raised if an input is given but malformed, i.e. a bad pagination cursor or limit"""
+  pass
+
 
 
 
@@ -88,17 +374,15 @@ def create_app(test_config=None):
     courses_formatted = []
   
     try:
-      courses = ( MentorCourse.query
-                              .with_entities(MentorCourse.name,MentorCourse.grade)
-                              .group_by(MentorCourse.name,MentorCourse.grade)
-                              .order_by(MentorCourse.grade.desc())
-                              .all() 
-                )
+      # served from the per-process snapshot of the course_catalog table which is maintained on every MentorCourse write
+      courses, etag = course_catalog_snapshot.get(load_course_catalog)
+      if is_not_modified(etag):
+        return not_modified(etag, COURSES_CACHE_CONTROL)
   
-      return jsonify ({
+      return with_validators(jsonify ({
           'success'  : True,
           'courses'  : courses
-          })
+          }), etag, COURSES_CACHE_CONTROL)
   
     except:
       abort(422)
@@ -161,8 +445,8 @@ def create_app(test_config=None):
         Description:         This method returns the student information based on the studetn id decoded from jwt
         Permission:          'read:student' permission required.
         Return Value:        Returns Student.format() which contains all inforamtion of student
-                             Courses that the student has completed previously as previous courses which is a list of MentorCourse.format()
-                             Courses that the student is currently enrolled in as current courses which is a list of MentorCourse.format()                              
+                             Courses that the student has completed previously as previous courses and courses that the student is currently enrolled in as current courses,
+                             both lists of MentorStudentPair.format() along with the mentor_name, course_name and grade of the course (None if the mentor or course was deleted)
         Return data format:  Returns status code 200 and json {"success": True, "student": student, "current_courses": list, "previous_courses": list }  
                              or appropriate status code indicating reason for failure
   '''   
@@ -179,13 +463,17 @@ def create_app(test_config=None):
       if student!=None:
         student_formatted = student.format()
   
-      previous_courses = MentorStudentPair.query.filter(MentorStudentPair.student_id==student_id, MentorStudentPair.present_student==False).all()
-      if previous_courses!=None:
-        previous_courses_formatted = [ previous_course.format() for previous_course in previous_courses ]
-  
-      current_courses = MentorStudentPair.query.filter(MentorStudentPair.student_id==student_id, MentorStudentPair.present_student==True).all()
-      if current_courses!=None:
-        current_courses_formatted = [ current_course.format() for current_course in current_courses ]
+      # one query for all mentorship pairs of the student with the names of their mentor and course
+      student_courses = ( MentorStudentPair.query
+                                 .outerjoin(Mentor, Mentor.userid==MentorStudentPair.mentor_id)
+                                 .outerjoin(MentorCourse, MentorCourse.id==MentorStudentPair.course_id)
+                                 .with_entities(MentorStudentPair, Mentor.name.label('mentor_name'), MentorCourse.name.label('course_name'), MentorCourse.grade.label('course_grade'))
+                                 .filter(MentorStudentPair.student_id==student_id)
+                                 .order_by(MentorStudentPair.id)
+                                 .all()
+                        )
+      current_courses_formatted = [ student_course_format(student_course) for student_course in student_courses if student_course.MentorStudentPair.present_student ]
+      previous_courses_formatted = [ student_course_format(student_course) for student_course in student_courses if not student_course.MentorStudentPair.present_student ]
       
       return jsonify ({
           'success'          : True,
@@ -269,8 +557,14 @@ def create_app(test_config=None):
         Description:         This method searches for a mentor with information from student, student_id is decoded from jwt. The mentor's city and state must match the information given by the student 
                              in the form along with the course name the student inputs and also the grade.
         Permission:          'read:student' permission required. 
-        Return Value:        The search output will include a list of mentors with the following mentor information: the mentor_id, time_available, grade, course name, course id.
-        Return data format:  Returns status code 200 and json {"success": True, "search_output":search_output}
+        Return Value:        The search output will include a list of mentors with the following mentor information: the mentor_id, time_available, grade, course name, course id,
+                             rating (average, 0 without feedback) and review_count.
+                             Results are ordered by course id, or by rating (best first) with optional input 'sort_by':'rating', and paginated: optional input 'limit'
+                             (default 50, at most 200) sets the page size and optional input 'cursor' takes the next_cursor of the previous page. next_cursor is null on the last page.
+                             Optional input 'available' (i.e. "Tue 16:00-18:00") only returns mentors whose weekly availability covers the whole time slot.
+                             Optional input 'search_mode':'text' matches the words of course_name against the course name and the mentor's qualifications with
+                             Postgres full-text search instead of a substring match, results are then ordered by relevance unless 'sort_by' says otherwise.
+        Return data format:  Returns status code 200 and json {"success": True, "search_output":search_output, "next_cursor": cursor}
                              or appropriate status code indicating reason for failure
   '''   
   @app.route('/student_access/search_mentors', methods=['POST'])
@@ -286,33 +580,315 @@ def create_app(test_config=None):
       city = search_input['city']
       state = search_input['state']
       grade = search_input['grade']
-  
-      search_query = (  Mentor.query
-                              .join(MentorCourse, Mentor.userid==MentorCourse.mentor_id)
-                              .with_entities(Mentor.userid.label('mentor_id'),Mentor.avail_time.label('time_available'),MentorCourse.name.label('course_name'),MentorCourse.id.label('course_id'))
-                              .filter(func.lower(Mentor.city)==func.lower(city), func.lower(Mentor.state)==func.lower(state) , MentorCourse.grade==grade , func.lower(MentorCourse.name).like('%'+func.lower(course_name)+'%'))
-                              .all()
-                     )
-  
-      search_output = op_format(search_query)
+      limit = read_limit(search_input.get('limit'), SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT)
+  
+      search_mode = search_input.get('search_mode', 'substring')
+      if search_mode not in ('substring', 'text'):
+        raise invalidInputError
+      sort_by = search_input.get('sort_by', 'relevance' if search_mode=='text' else 'course_id')
+      if sort_by not in ('course_id', 'rating', 'relevance') or (sort_by=='relevance' and search_mode!='text'):
+        raise invalidInputError
+      slot = read_slot(search_input.get('available'))
+
+      after_course_id = None
+      after_score = None
+      if search_input.get('cursor') is not None:
+        cursor_values = decode_cursor(search_input['cursor'])
+        if sort_by in ('rating', 'relevance'):
+          if len(cursor_values)!=2 or isinstance(cursor_values[0], bool) or not isinstance(cursor_values[0], (int, float)) or not isinstance(cursor_values[1], int):
+            raise invalidInputError
+          after_score, after_course_id = cursor_values
+        else:
+          if len(cursor_values)!=1 or not isinstance(cursor_values[0], int):
+            raise invalidInputError
+          after_course_id = cursor_values[0]
+
+      # identical searches are answered from search_result_cache until a write that can change their result commits
+      cache_key = search_result_cache.make_key(sort_by, course_name, city, state, grade, search_input.get('cursor'), limit, slot, search_mode)
+      cached_result = search_result_cache.get(cache_key) if cache_key is not None else None
+      if cached_result is not None:
+        return jsonify({
+           'success' : True,
+           'search_output' : cached_result[0],
+           'next_cursor' : cached_result[1]
+          })
+      cache_generation = search_result_cache.generation
+
+      search_rows = None
+      if search_mode=='substring' and sort_by=='course_id' and slot is None:
+        search_rows = indexed_search(course_name, city, state, grade, after_course_id, limit+1)
+
+      if search_rows is None:
+        search_query = (  Mentor.query
+                                .join(MentorCourse, Mentor.userid==MentorCourse.mentor_id)
+                                .with_entities(Mentor.userid.label('mentor_id'),Mentor.avail_time.label('time_available'),MentorCourse.name.label('course_name'),MentorCourse.id.label('course_id'))
+                                .filter(func.lower(Mentor.city)==func.lower(city), func.lower(Mentor.state)==func.lower(state) , MentorCourse.grade==grade)
+                       )
+        if search_mode=='text':
+          # topic words are matched against the generated tsvectors of course name and qualifications (GIN indexes ix_*_search_vector)
+          text_query = func.plainto_tsquery(TEXT_SEARCH_CONFIG, course_name)
+          search_query = search_query.filter(or_(MentorCourse.search_vector.op('@@')(text_query), Mentor.search_vector.op('@@')(text_query)))
+        else:
+          # the course name filter lower(name) LIKE '%...%' is served by the trigram index ix_mentor_courses_lower_name_trgm
+          search_query = search_query.filter(func.lower(MentorCourse.name).like('%'+func.lower(course_name)+'%'))
+        if slot is not None:
+          search_query = search_query.filter(availability_filter(slot))
+        if sort_by in ('rating', 'relevance'):
+          if sort_by=='rating':
+            # computed from the mentor's rating_sum and rating_count columns, no aggregation over feedbacks
+            score = mentor_rating()
+          else:
+            # rounded like the rating so that the value in the cursor compares equal to the value computed by the next query
+            score = func.round(cast(func.ts_rank(MentorCourse.search_vector.op('||')(Mentor.search_vector), text_query), Numeric), RELEVANCE_DECIMALS)
+          search_query = search_query.add_columns(score.label('score'))
+          if after_course_id is not None:
+            search_query = search_query.filter(or_(score < after_score, and_(score == after_score, MentorCourse.id > after_course_id)))
+          search_query = search_query.order_by(score.desc(), MentorCourse.id)
+        else:
+          if after_course_id is not None:
+            search_query = search_query.filter(MentorCourse.id > after_course_id)
+          search_query = search_query.order_by(MentorCourse.id)
+
+        search_rows = search_query.limit(limit+1).all()
+
+      next_cursor = None
+      has_more = len(search_rows) > limit
+      search_rows = search_rows[:limit]
+      ratings = mentor_ratings([row.mentor_id for row in search_rows])
+      if has_more:
+        last_row = search_rows[-1]
+        if sort_by in ('rating', 'relevance'):
+          next_cursor = encode_cursor([float(last_row.score), last_row.course_id])
+        else:
+          next_cursor = encode_cursor([last_row.course_id])
+  
+      search_output = op_format(search_rows, ratings)
+      search_result_cache.put(cache_key, (search_output, next_cursor), cache_generation)
       
       return jsonify({
          'success' : True,
-         'search_output' : search_output
+         'search_output' : search_output,
+         'next_cursor' : next_cursor
         })
     
     except inputNotSpecifiedError:
       abort(400)
+    except invalidInputError:
+      abort(400)
     except:
       abort(422)
     
+  '''
+  Endpoint: POST /student_access/search_mentors_batch
+        Description:         This method runs several mentor searches for one location in one request, student_id is decoded from jwt. Input 'queries' is a list of
+                             at most 20 {"course_name", "grade"} searches, 'city' and 'state' apply to all of them and are matched like in POST /student_access/search_mentors.
+                             Searches missing from the search cache are answered in one pass over the in-memory search index or else by a single SQL statement.
+        Permission:          'read:student' permission required.
+        Return Value:        One result group per query, in the order of the queries, holding the course_name and grade of the query, its search_output
+                             (same format and order as POST /student_access/search_mentors) and a next_cursor to fetch more results with POST /student_access/search_mentors.
+                             Optional input 'limit' (default 50, at most 200) applies to every query.
+        Return data format:  Returns status code 200 and json {"success": True, "search_results": list}
+                             or appropriate status code indicating reason for failure
+  '''
+  @app.route('/student_access/search_mentors_batch', methods=['POST'])
+  @requires_auth('read:student')
+  def student_search_mentors_batch(student_id):
+
+    try:
+      search_input = request.get_json()
+      if search_input==None:
+        raise inputNotSpecifiedError
+
+      city = search_input['city']
+      state = search_input['state']
+      queries = search_input['queries']
+      if not isinstance(queries, list) or len(queries)==0 or len(queries) > BATCH_MAX_QUERIES:
+        raise invalidInputError
+      limit = read_limit(search_input.get('limit'), SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT)
+
+      cache_generation = search_result_cache.generation
+      search_groups = {}
+      cache_keys = {}
+      computed_rows = {}
+      sql_queries = []
+      for query_index, query in enumerate(queries):
+        course_name = query['course_name']
+        grade = query['grade']
+        cache_keys[query_index] = search_result_cache.make_key('course_id', course_name, city, state, grade, None, limit)
+        cached_result = search_result_cache.get(cache_keys[query_index]) if cache_keys[query_index] is not None else None
+        if cached_result is not None:
+          search_groups[query_index] = cached_result
+          continue
+        search_rows = indexed_search(course_name, city, state, grade, None, limit+1)
+        if search_rows is None:
+          sql_queries.append((query_index, course_name, grade))
+        else:
+          computed_rows[query_index] = search_rows
+
+      if sql_queries:
+        computed_rows.update(batch_sql_search(city, state, sql_queries, limit+1))
+
+      ratings = mentor_ratings([row.mentor_id for search_rows in computed_rows.values() for row in search_rows[:limit]])
+      for query_index, search_rows in computed_rows.items():
+        next_cursor = encode_cursor([search_rows[limit-1].course_id]) if len(search_rows) > limit else None
+        search_groups[query_index] = (op_format(search_rows[:limit], ratings), next_cursor)
+        search_result_cache.put(cache_keys[query_index], search_groups[query_index], cache_generation)
+
+      search_results = []
+      for query_index, query in enumerate(queries):
+        search_output, next_cursor = search_groups[query_index]
+        search_results.append({
+          'course_name'   : query['course_name'],
+          'grade'         : query['grade'],
+          'search_output' : search_output,
+          'next_cursor'   : next_cursor
+        })
+
+      return jsonify({
+         'success' : True,
+         'search_results' : search_results
+        })
+
+    except inputNotSpecifiedError:
+      abort(400)
+    except invalidInputError:
+      abort(400)
+    except:
+      abort(422)
+
+  '''
+  Endpoint: POST /student_access/mentor_ratings
+        Description:         This method returns the ratings of several mentors in one request, student_id is decoded from jwt. Input 'mentor_ids' is a list of
+                             at most 300 mentor ids, the ratings are read by a single query.
+        Permission:          'read:student' permission required.
+        Return Value:        ratings maps every existing mentor id of the input to [rating, review_count], rating is the average rating (0 without feedback)
+                             like in the search output. Unknown mentor ids are left out.
+        Return data format:  Returns status code 200 and json {"success": True, "ratings": {mentor_id: [rating, review_count]}}
+                             or appropriate status code indicating reason for failure
+  '''
+  @app.route('/student_access/mentor_ratings', methods=['POST'])
+  @requires_auth('read:student')
+  def student_mentor_ratings(student_id):
+
+    try:
+      ratings_input = request.get_json()
+      if ratings_input==None:
+        raise inputNotSpecifiedError
+
+      mentor_ids = ratings_input['mentor_ids']
+      if not isinstance(mentor_ids, list) or len(mentor_ids)==0 or len(mentor_ids) > RATINGS_MAX_MENTORS:
+        raise invalidInputError
+      if not all(isinstance(mentor_id, str) for mentor_id in mentor_ids):
+        raise invalidInputError
+
+      ratings = mentor_ratings(mentor_ids)
+
+      return jsonify({
+         'success' : True,
+         'ratings' : {mentor_id: [rating, review_count] for mentor_id, (rating, review_count) in ratings.items()}
+        })
+
+    except inputNotSpecifiedError:
+      abort(400)
+    except invalidInputError:
+      abort(400)
+    except:
+      abort(422)
+
+  '''
+  Endpoint: POST /student_access/search_mentors_nearby
+        Description:         This method searches for mentors within a radius of the student, student_id is decoded from jwt. The search is centered on the city and state
+                             of the student profile, or on the optional inputs city and state. Course name and grade are matched like in POST /student_access/search_mentors.
+        Permission:          'read:student' permission required.
+        Return Value:        The search output will include the nearest mentors with the following mentor information: the mentor_id, time_available, course name, course id, distance_km,
+                             rating and review_count. Results are ordered by distance, or by rating with optional input 'sort_by':'rating'.
+                             Optional input 'available' filters by time slot like in POST /student_access/search_mentors.
+                             Optional input 'radius_km' (default 25, at most 100) sets the search radius and optional input 'limit' (default 50, at most 200) the number of results.
+                             Cities are geocoded with the bundled gazetteer, which lists only 115 US cities (36 of them in California). If the city of the search
+                             is not listed, the search falls back to the mentors of the same city and state (matched like in POST /student_access/search_mentors)
+                             and their distance_km is null. Mentors in unlisted cities are not found by searches centered on another city.
+        Return data format:  Returns status code 200 and json {"success": True, "search_output":search_output}
+                             or appropriate status code indicating reason for failure
+  '''
+  @app.route('/student_access/search_mentors_nearby', methods=['POST'])
+  @requires_auth('read:student')
+  def student_search_mentors_nearby(student_id):
+
+    try:
+      search_input = request.get_json()
+      if search_input==None:
+        raise inputNotSpecifiedError
+
+      course_name = search_input['course_name']
+      grade = search_input['grade']
+      radius_km = read_radius(search_input.get('radius_km'))
+      limit = read_limit(search_input.get('limit'), SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT)
+      sort_by = search_input.get('sort_by', 'distance')
+      if sort_by not in ('distance', 'rating'):
+        raise invalidInputError
+      slot = read_slot(search_input.get('available'))
+
+      if search_input.get('city') is not None and search_input.get('state') is not None:
+        city, state = search_input['city'], search_input['state']
+        origin = geocode(city, state)
+      else:
+        student = Student.query.filter(Student.userid==student_id).one_or_none()
+        if student is None:
+          raise resourceNotFoundError
+        city, state = student.city, student.state
+        origin = None if student.latitude is None else (student.latitude, student.longitude)
+
+      candidates = (  Mentor.query
+                            .join(MentorCourse, Mentor.userid==MentorCourse.mentor_id)
+                            .with_entities(Mentor.userid.label('mentor_id'),Mentor.avail_time.label('time_available'),MentorCourse.name.label('course_name'),MentorCourse.id.label('course_id'),Mentor.latitude,Mentor.longitude)
+                            .filter(MentorCourse.grade==grade, func.lower(MentorCourse.name).like('%'+func.lower(course_name)+'%'))
+                   )
+      if origin is not None:
+        # only the mentors of the geohash cells covering the search circle are read, through ix_mentors_geo_cell
+        candidates = candidates.filter(Mentor.geo_cell.in_(covering_cells(origin[0], origin[1], radius_km)))
+      else:
+        # the city is not in the gazetteer, fall back to the mentors of the same city like POST /student_access/search_mentors
+        candidates = candidates.filter(func.lower(Mentor.city)==func.lower(city), func.lower(Mentor.state)==func.lower(state))
+      if slot is not None:
+        candidates = candidates.filter(availability_filter(slot))
+
+      nearby_rows = []
+      for row in candidates.all():
+        if origin is None:
+          nearby_rows.append((None, row))
+          continue
+        distance = distance_km(origin[0], origin[1], row.latitude, row.longitude)
+        if distance <= radius_km:
+          nearby_rows.append((distance, row))
+      ratings = mentor_ratings([row.mentor_id for distance, row in nearby_rows])
+      # rows of the same city fallback have no distance and are ordered as if they were at the origin
+      if sort_by=='rating':
+        nearby_rows.sort(key=lambda nearby_row: (-ratings.get(nearby_row[1].mentor_id, (0, 0))[0], nearby_row[0] or 0, nearby_row[1].course_id))
+      else:
+        nearby_rows.sort(key=lambda nearby_row: (nearby_row[0] or 0, nearby_row[1].course_id))
+
+      return jsonify({
+         'success' : True,
+         'search_output' : nearby_format(nearby_rows[:limit], ratings)
+        })
+
+    except inputNotSpecifiedError:
+      abort(400)
+    except invalidInputError:
+      abort(400)
+    except resourceNotFoundError:
+      abort(404)
+    except:
+      abort(422)
+
   '''
   Endpoint: GET /student_access/mentors/<mentor_id>
         Description:         This method returns the mentor information based on the mentor id decoded from request
         Permission:          'read:student' permission required.
         Return Value:        Returns Mentor.format_student() which contains all non-confidential information of mentor
                              Courses that the mentor offers which is a list of MentorCourse.format()
-        Return data format:  Returns status code 200 and json {"success": True, "mentor_details": mentor, "courses": list }  
+                             Weekly availability of the mentor as a list of time slots, i.e. "Tue 16:00-18:00"
+        Return data format:  Returns status code 200 and json {"success": True, "mentor_details": mentor, "courses": list, "availability": list }  
                              or appropriate status code indicating reason for failure
   '''  
   @app.route('/student_access/mentors/<mentor_id>',methods=['GET'])
@@ -322,21 +898,32 @@ def create_app(test_config=None):
     courses_formatted = []
   
     try:
+      # the version alone decides a conditional request, the profile is only loaded when it has changed
+      etag = None
+      if request.if_none_match:
+        version = mentor_version(mentor_id)
+        etag = profile_etag('student_mentor_info', mentor_id, version) if version!=None else None
+        if is_not_modified(etag):
+          return not_modified(etag, PROFILE_CACHE_CONTROL)
+
       mentor = Mentor.query.filter(Mentor.userid==mentor_id).first()
       if mentor!=None:
         mentor_formatted = mentor.format_student()
       else:
         raise resourceNotFoundError
+      if etag==None:
+        etag = profile_etag('student_mentor_info', mentor_id, mentor.version)
           
       courses = MentorCourse.query.filter(MentorCourse.mentor_id==mentor_id).all()
       if len(courses)!=0:
         courses_formatted = [course.format() for course in courses]
   
-      return jsonify({
+      return with_validators(jsonify({
         'success' : True,
         'mentor_details': mentor_formatted,
-        'courses':courses_formatted
-        })
+        'courses':courses_formatted,
+        'availability': [interval.format() for interval in mentor.availability]
+        }), etag, PROFILE_CACHE_CONTROL)
     except resourceNotFoundError:
       abort(404)
     except:
@@ -347,6 +934,7 @@ def create_app(test_config=None):
   Endpoint: POST /student_access/feedback
         Description:         This method adds a feedback from student to mentor into the database, student_id is decoded from jwt. Mentor_id, rating, feedback message are form inputs form Student.
                              Feedback can only be given by students tutored by mentor. Also, there is a maximum limit of 2 feedbacks per student. 
+                             The rating must be an integer from 0 to 5, any other value is rejected with status code 400.
         Permission:          'post:student' permission required. 
         Return data format:  Returns status code 200 and json {"success": True}
                              or appropriate status code indicating reason for failure
@@ -359,6 +947,11 @@ def create_app(test_config=None):
       input_request = request.get_json()
       if input_request is None:
         raise inputNotSpecifiedError
+
+      # the rating is stored as given, anything but an integer 0-5 would be rounded by the database and break mentors.rating_sum
+      rating = input_request['rating']
+      if isinstance(rating, bool) or not isinstance(rating, int) or rating < 0 or rating > 5:
+        raise invalidInputError
       
       mentor_found = Mentor.query.filter(Mentor.userid==input_request['mentor_id']).one_or_none()
       if mentor_found==None:
@@ -374,7 +967,7 @@ def create_app(test_config=None):
   
       new_feedback = Feedback( 
                                mentor_id=input_request['mentor_id'],
-                               rating=input_request['rating'],
+                               rating=rating,
                                message=input_request['message'],
                                student_id=student_id
                                )
@@ -386,6 +979,8 @@ def create_app(test_config=None):
   
     except inputNotSpecifiedError:
       abort(400)
+    except invalidInputError:
+      abort(400)
     except resourceNotFoundError:
       abort(404)
     except actionNotPermittedError:
@@ -442,7 +1037,10 @@ def create_app(test_config=None):
         Description:         This method returns the reply messages from mentor based on the student id decoded from jwt
         Permission:          'read:student' permission required.
         Return Value:        Returns a list of reply messages as ReplyMessage.format() which contains the message from mentor
-        Return data format:  Returns status code 200 and json {"success": True, "reply_messages": list }  
+                             Newest messages first, optional query parameters 'limit' (default 50, at most 200) and 'before_id' taking the next_before_id of the previous page
+                             Optional query parameter 'since_id' taking the high_water_mark of the previous response returns only the newer messages, oldest first,
+                             with has_more set if more than limit arrived (poll again with the new high_water_mark)
+        Return data format:  Returns status code 200 and json {"success": True, "reply_messages": list, "next_before_id": id, "high_water_mark": id } or with since_id {"success": True, "reply_messages": list, "high_water_mark": id, "has_more": bool }  
                              or appropriate status code indicating reason for failure
   '''    
   @app.route('/student_access/reply_messages',methods=['GET']) 
@@ -451,15 +1049,17 @@ def create_app(test_config=None):
     messages_formatted = []
   
     try:
-      messages = ReplyMessage.query.order_by(ReplyMessage.id.desc()).filter(ReplyMessage.student_id==student_id).all()
+      messages, page_fields = inbox_page(ReplyMessage.query.filter(ReplyMessage.student_id==student_id), ReplyMessage.id)
       if len(messages)!=None:
         messages_formatted = [message.format() for message in messages]
   
-      return jsonify({
+      return jsonify(dict({
         'success':True,
         'reply_messages': messages_formatted
-        })
+        }, **page_fields))
   
+    except invalidInputError:
+      abort(400)
     except:
       abort(422)
   
@@ -553,8 +1153,11 @@ def create_app(test_config=None):
                              Previous students that the mentor has tutored as previous_students which is a list of MentorStudentPair.format() which returns student_id, year of tutoring etc                            
                              Current students that the mentor is tutoring as current_students which is a list of MentorStudentPair.format() which returns student id, year of tutoring etc 
                              Feedbacks that the mentor has recived as a list of Feedback.format()
-                             Overall rating of the mentor calculated using return_rating method.                            
-        Return data format:  Returns status code 200 and json {"success": True, 'mentor_info' : mentor, "courses_offered": list, "previous_students": list, "current_students": list, "feedbacks": list, "rating":int }  
+                             Overall rating of the mentor calculated using Mentor.average_rating().
+                             Feedbacks, current students and previous students are paged separately, oldest first: optional query parameters feedbacks_limit,
+                             current_students_limit and previous_students_limit (default 50, at most 200) and the matching *_cursor parameters taking the
+                             feedbacks_next_cursor, current_students_next_cursor and previous_students_next_cursor of the previous response (None on the last page).
+        Return data format:  Returns status code 200 and json {"success": True, 'mentor_info' : mentor, "courses_offered": list, "previous_students": list, "current_students": list, "feedbacks": list, "rating":int, "feedbacks_next_cursor": cursor, ... }  
                              or appropriate status code indicating reason for failure
   '''   
   @app.route('/mentor_access', methods=['GET'])
@@ -565,42 +1168,67 @@ def create_app(test_config=None):
     current_students_formatted = []
     previous_students_formatted = []
     feedbacks_formatted = []
+    next_cursors = dict.fromkeys(DASHBOARD_SECTIONS)
     rating = 0
   
     try:
+      pages = {section: read_section_page(section) for section in DASHBOARD_SECTIONS}
+      page_params = sorted(request.args.items())
 
-      mentor = Mentor.query.filter(Mentor.userid==mentor_id).first()
+      # the version alone decides a conditional request, the profile is only loaded when it has changed
+      etag = None
+      if request.if_none_match:
+        version = mentor_version(mentor_id)
+        etag = profile_etag('mentor_mentor_info', mentor_id, version, page_params) if version!=None else None
+        if is_not_modified(etag):
+          return not_modified(etag, PROFILE_CACHE_CONTROL)
+
+      mentor = Mentor.query.options(joinedload(Mentor.offer_courses)).filter(Mentor.userid==mentor_id).first()
       if mentor!=None:
         mentor_formatted = mentor.format()
+        if etag==None:
+          etag = profile_etag('mentor_mentor_info', mentor_id, mentor.version, page_params)
 
-      courses_offered = MentorCourse.query.filter(MentorCourse.mentor_id==mentor_id).all()
-      if courses_offered!=None:
-        courses_offered_formatted = [ course_offered.format() for course_offered in courses_offered ]
-  
-      current_students = MentorStudentPair.query.filter(MentorStudentPair.mentor_id==mentor_id, MentorStudentPair.present_student==True).all()
-      if current_students!=None:
-        current_students_formatted = [current_student.format() for current_student in current_students]
+        courses_offered_formatted = [ course_offered.format() for course_offered in sorted(mentor.offer_courses, key=lambda course: course.id) ]
+        rating = mentor.average_rating()
 
-      previous_students = MentorStudentPair.query.filter(MentorStudentPair.mentor_id==mentor_id, MentorStudentPair.present_student==False).all()
-      if previous_students!=None:
-        previous_students_formatted = [previous_student.format() for previous_student in previous_students]
-       
-      feedbacks = Feedback.query.filter(Feedback.mentor_id==mentor_id).all()
-      if feedbacks!=None:
+        feedback_limit, after_feedback_id = pages['feedbacks']
+        feedback_query = Feedback.query.filter(Feedback.mentor_id==mentor_id)
+        if after_feedback_id is not None:
+          feedback_query = feedback_query.filter(Feedback.id > after_feedback_id)
+        feedbacks, next_cursors['feedbacks'] = section_page(feedback_query.order_by(Feedback.id).limit(feedback_limit+1).all(), feedback_limit)
         feedbacks_formatted = [feedback.format() for feedback in feedbacks]
 
-      rating = return_rating(mentor_id)
+        # the pages of current and previous students are read by one UNION ALL of two index range scans
+        pair_queries = []
+        for present_student, section in ((True, 'current_students'), (False, 'previous_students')):
+          pair_limit, after_pair_id = pages[section]
+          pair_query = MentorStudentPair.query.filter(MentorStudentPair.mentor_id==mentor_id, MentorStudentPair.present_student==present_student)
+          if after_pair_id is not None:
+            pair_query = pair_query.filter(MentorStudentPair.id > after_pair_id)
+          pair_queries.append(pair_query.order_by(MentorStudentPair.id).limit(pair_limit+1))
+        mentorship_pairs = sorted(pair_queries[0].union_all(pair_queries[1]).all(), key=lambda pair: pair.id)
+
+        current_students, next_cursors['current_students'] = section_page([pair for pair in mentorship_pairs if pair.present_student], pages['current_students'][0])
+        previous_students, next_cursors['previous_students'] = section_page([pair for pair in mentorship_pairs if not pair.present_student], pages['previous_students'][0])
+        current_students_formatted = [pair.format() for pair in current_students]
+        previous_students_formatted = [pair.format() for pair in previous_students]
  
-      return jsonify ({
+      return with_validators(jsonify ({
           'success'  : True,
           'mentor_info' : mentor_formatted,
           'current_students' : current_students_formatted,
           'previous_students': previous_students_formatted,
           'courses_offered': courses_offered_formatted,
           'feedbacks': feedbacks_formatted,
-          'rating': rating
-          })
+          'rating': rating,
+          'current_students_next_cursor': next_cursors['current_students'],
+          'previous_students_next_cursor': next_cursors['previous_students'],
+          'feedbacks_next_cursor': next_cursors['feedbacks']
+          }), etag, PROFILE_CACHE_CONTROL)
   
+    except invalidInputError:
+      abort(400)
     except:
       abort(422)
   
@@ -742,6 +1370,75 @@ def create_app(test_config=None):
       abort(422)  
   
   
+  '''
+  Endpoint: PUT /mentor_access/availability
+        Description:         This method replaces the weekly availability of the mentor, mentor_id is decoded from jwt. Input 'availability' is a list of time slots
+                             like "Tue 16:00-18:00", a slot ending before it starts ends on the next day ("Fri 22:00-01:00"). Overlapping slots are merged.
+        Permission:          'update:mentor' permission required.
+        Return data format:  Returns status code 200 and json {"success": True, "availability": list} with the stored time slots
+                             or appropriate status code indicating reason for failure
+  '''
+  @app.route('/mentor_access/availability', methods=['PUT'])
+  @requires_auth('update:mentor')
+  def mentor_update_availability(mentor_id):
+
+    try:
+      input_request = request.get_json()
+      if input_request is None:
+        raise inputNotSpecifiedError
+
+      update_mentor = Mentor.query.filter(Mentor.userid==mentor_id).one_or_none()
+      if update_mentor is None:
+        raise resourceNotFoundError
+
+      try:
+        intervals = parse_availability(input_request['availability'])
+      except ValueError:
+        raise invalidInputError
+
+      update_mentor.availability = [MentorAvailability(day_of_week, start_minute, end_minute) for day_of_week, start_minute, end_minute in intervals]
+      update_mentor.update()
+
+      return jsonify({
+         'success' : True,
+         'availability' : [interval.format() for interval in update_mentor.availability]
+        })
+
+    except inputNotSpecifiedError:
+      abort(400)
+    except invalidInputError:
+      abort(400)
+    except resourceNotFoundError:
+      abort(404)
+    except:
+      abort(422)
+
+  '''
+  Endpoint: GET /mentor_access/availability
+        Description:         This method returns the weekly availability of the mentor, mentor_id is decoded from jwt
+        Permission:          'read:mentor' permission required.
+        Return data format:  Returns status code 200 and json {"success": True, "availability": list} where list holds time slots like "Tue 16:00-18:00"
+                             or appropriate status code indicating reason for failure
+  '''
+  @app.route('/mentor_access/availability', methods=['GET'])
+  @requires_auth('read:mentor')
+  def mentor_get_availability(mentor_id):
+
+    try:
+      mentor = Mentor.query.filter(Mentor.userid==mentor_id).one_or_none()
+      if mentor is None:
+        raise resourceNotFoundError
+
+      return jsonify({
+         'success' : True,
+         'availability' : [interval.format() for interval in mentor.availability]
+        })
+
+    except resourceNotFoundError:
+      abort(404)
+    except:
+      abort(422)
+
   '''
   Endpoint: GET /mentor_access/students/<student_id>
         Description:         This method returns the student information based on the student id decoded from input request
@@ -861,7 +1558,10 @@ def create_app(test_config=None):
         Description:         This method returns the request messages from students based on the mentor id decoded from jwt
         Permission:          'read:mentor' permission required.
         Return Value:        Returns a list of request messages as RequestMessage.format() which contains the messages from students. It returns in descending order of req message id.
-        Return data format:  Returns status code 200 and json {"success": True, "request_messages": list }  
+                             Optional query parameters 'limit' (default 50, at most 200) and 'before_id' taking the next_before_id of the previous page
+                             Optional query parameter 'since_id' taking the high_water_mark of the previous response returns only the newer messages, oldest first,
+                             with has_more set if more than limit arrived (poll again with the new high_water_mark)
+        Return data format:  Returns status code 200 and json {"success": True, "request_messages": list, "next_before_id": id, "high_water_mark": id } or with since_id {"success": True, "request_messages": list, "high_water_mark": id, "has_more": bool }  
                              or appropriate status code indicating reason for failure
   '''    
   @app.route('/mentor_access/request_messages', methods=['GET'])
@@ -870,15 +1570,17 @@ def create_app(test_config=None):
     messages_formatted = []
   
     try:
-      messages = RequestMessage.query.order_by(RequestMessage.id.desc()).filter(RequestMessage.mentor_id==mentor_id).all()
+      messages, page_fields = inbox_page(RequestMessage.query.filter(RequestMessage.mentor_id==mentor_id), RequestMessage.id)
       if len(messages)!=None:
         messages_formatted = [message.format() for message in messages]
   
-      return jsonify({
+      return jsonify(dict({
         'success':True,
         'request_messages': messages_formatted
-        })
+        }, **page_fields))
   
+    except invalidInputError:
+      abort(400)
     except:
       abort(422)
   
@@ -1093,6 +1795,30 @@ def create_app(test_config=None):
       abort(422)  
   
   
+  '''
+  Endpoint: GET /admin_access/auth_metrics
+        Description:         This method returns the authorization metrics of the worker process that serves the request
+        Permission:          'read:admin' permission required.
+        Return Value:        Returns latency histograms (in milliseconds) of every requires_auth stage per permission string:
+                             header, token_cache, jwks, signature, permissions, identity
+                             Hit and miss counters of the verified token cache and the state of the jwks key store
+        Return data format:  Returns status code 200 and json {"success": True, "auth_metrics": metrics }  
+                             or appropriate status code indicating reason for failure
+  ''' 
+  @app.route('/admin_access/auth_metrics', methods=['GET'])
+  @requires_auth('read:admin')
+  def admin_auth_metrics(admin_id):
+  
+    try:
+      return jsonify({
+        'success' : True,
+        'auth_metrics' : auth_metrics()
+        })
+  
+    except:
+      abort(422)
+  
+  
   ######################ERROR HANDLING PART2####################################
   
   '''
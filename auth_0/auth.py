@@ -2,16 +2,73 @@
     REFERENCES: Identity and Access Management section of Udacity Full stack nano degree program
 '''
 import os
-import json
 from flask import request, _request_ctx_stack
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+from jose.utils import base64url_decode
+
+from auth_0.jwks import JWKSKeyStore, JWKSUnavailableError, load_jwks_file
+from auth_0.token_cache import TokenCache
+from auth_0.metrics import AuthTimings, NULL_TIMER
+
+
+'''
+    parse_algorithms(value) - Method to read the allowed signing algorithms from the ALGORITHMS environment variable
+    The value is a comma separated list which may be written like a python list, i.e. ['RS256'] or [RS256] once the shell removed the quotes.
+    It returns the list of algorithm names or None if the variable is not set.
+'''
+def parse_algorithms(value):
+    if value is None:
+        return None
+    return [algorithm.strip().strip('\'"') for algorithm in value.strip().strip('[]').split(',') if algorithm.strip().strip('\'"')]
 
 
 AUTH0_DOMAIN= os.getenv('AUTH0_DOMAIN')
-ALGORITHMS= os.getenv('ALGORITHMS')
+ALGORITHMS= parse_algorithms(os.getenv('ALGORITHMS'))
 API_AUDIENCE = os.getenv('API_AUDIENCE')
+JWKS_BACKGROUND_REFRESH = os.getenv('JWKS_BACKGROUND_REFRESH', 'true').lower() == 'true'
+JWKS_FILE = os.getenv('JWKS_FILE')
+AUTH_TIMING = os.getenv('AUTH_TIMING', 'true').lower() == 'true'
+
+AUTH0_ISSUER = f'https://{AUTH0_DOMAIN}/'
+USERNAME_CLAIM = 'https://anusha.example.com/username'
+
+## JWKS key store shared by all requests handled by this process
+## Offline mode: if JWKS_FILE is set the keys are read from that file instead of Auth0
+if JWKS_FILE:
+    jwks_store = JWKSKeyStore(JWKS_FILE, fetch=load_jwks_file)
+else:
+    jwks_store = JWKSKeyStore(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json', background_refresh=JWKS_BACKGROUND_REFRESH)
+
+## Payloads of already verified tokens, kept until the tokens expire
+token_cache = TokenCache()
+
+## Per stage latency histograms of requires_auth, keyed by permission
+auth_timings = AuthTimings()
+
+'''
+    use_local_issuer(issuer) - Method to switch token verification to the keys of an in-process LocalTokenIssuer (offline mode)
+    Used by tests and benchmarks which mint their own tokens with auth_0.local_issuer
+'''
+def use_local_issuer(issuer):
+    global jwks_store
+    jwks_store = JWKSKeyStore('local-issuer', fetch=lambda jwks_url: issuer.jwks())
+    token_cache.clear()
+
+'''
+    auth_metrics() - Method to collect the auth metrics of this process
+    It returns the per stage latency histograms, the token cache counters and the state of the jwks key store
+'''
+def auth_metrics():
+    return {
+        'timings'     : auth_timings.format(),
+        'token_cache' : token_cache.stats(),
+        'jwks'        : {
+            'stale'                : jwks_store.is_expired(),
+            'circuit_open'         : jwks_store.is_circuit_open(),
+            'consecutive_failures' : jwks_store.consecutive_failures
+        }
+    }
 
 ## AuthError Exception
 '''
@@ -56,16 +113,34 @@ def get_token_auth_header():
     return token
 
 '''
-    verify_decode_jwt(token) - Method to verify the input json web token (string) and decode it
+    verify_signature(token, key, algorithm) - Method to check the signature of the token with a prepared key object from jwks_store
+    It raises a JWTError if the algorithm is not allowed or if the signature does not match.
+'''
+def verify_signature(token, key, algorithm):
+    if ALGORITHMS is not None and algorithm not in ALGORITHMS:
+        raise jwt.JWTError('The specified alg value is not allowed')
+
+    signing_input, crypto_segment = token.encode('utf-8').rsplit(b'.', 1)
+    if not key.verify(signing_input, base64url_decode(crypto_segment)):
+        raise jwt.JWTError('Signature verification failed.')
+
+'''
+    verify_decode_jwt(token, timer) - Method to verify the input json web token (string) and decode it
     This method verifies the token using Auth0 /.well-known/jwks.json. It verifies if the token is an Auth0 token with key id (kid).
+    The jwks document is served from the in-process jwks_store instead of being downloaded for every request.
+    Tokens that were verified before are answered from token_cache without checking the signature again.
+    The signature is checked against the key object prepared by jwks_store, jwt.decode is then only used to validate the claims.
     It decodes the payload from the token and validates the claims. It returns the decoded payload if the token is succesfully verified
     or appropriate error signature.
+    The optional timer (see auth_0.metrics) records the time spent in the token_cache, jwks and signature stages.
 '''
-def verify_decode_jwt(token):
-    json_url = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks_reference = json.loads(json_url.read())
+def verify_decode_jwt(token, timer=NULL_TIMER):
+    with timer.stage('token_cache'):
+        payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
     unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
     
     if 'kid' not in unverified_header:
         raise AuthError({
@@ -73,25 +148,27 @@ def verify_decode_jwt(token):
             'description': 'Key id not in header'  
         },401)
 
-    for key in jwks_reference['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kid' : key['kid'],
-                'kty' : key['kty'],
-                'use' : key['use'],
-                'n'   : key['n'],
-                'e'   : key['e']
-            }
+    try:
+        with timer.stage('jwks'):
+            rsa_key = jwks_store.get_key(unverified_header['kid'])
+    except JWKSUnavailableError:
+        raise AuthError({
+            'code': 'jwks_unavailable',
+            'description': 'Unable to fetch the signing keys, try again later'  
+        },503)
     
-    if rsa_key:
+    if rsa_key is not None:
         try:
-            payload = jwt.decode(
-                token,
-                rsa_key,
-                algorithms = ALGORITHMS,
-                audience=API_AUDIENCE,
-                issuer='https://'+AUTH0_DOMAIN+'/'
-            )
+            with timer.stage('signature'):
+                verify_signature(token, rsa_key, unverified_header.get('alg'))
+                payload = jwt.decode(
+                    token,
+                    None,
+                    audience=API_AUDIENCE,
+                    issuer=AUTH0_ISSUER,
+                    options={'verify_signature': False}
+                )
+            token_cache.put(token, payload)
             return payload
         
         except jwt.ExpiredSignatureError:
@@ -148,13 +225,13 @@ def check_permissions(permission, payload):
    Also, the username is specific to the app. It makes good primary key
 '''
 def get_user_identity(payload):
-    if 'https://anusha.example.com/username' not in payload:
+    if USERNAME_CLAIM not in payload:
         raise AuthError({
                 'code': 'username not available',
                 'description': 'Check that you have a username'  
             },401)
   
-    return payload['https://anusha.example.com/username']
+    return payload[USERNAME_CLAIM]
 
 '''
     @requires_auth(permission) - decorator method to authorize acess to the endpoints.
@@ -166,15 +243,20 @@ def get_user_identity(payload):
     check_permissions method to check the requested permission. If any of the aove steps fail, an 
     error is flagged right away. If the authorization is sucessful, decoded payload is returned to
     the decorated method.    
+    Unless AUTH_TIMING is set to false, the time spent in every step is recorded in auth_timings under the permission.
 '''
 def requires_auth(permission=''):
     def requires_auth_decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
-            check_permissions(permission, payload)
-            user_identity = get_user_identity(payload)
+            timer = auth_timings.timer(permission) if AUTH_TIMING else NULL_TIMER
+            with timer.stage('header'):
+                token = get_token_auth_header()
+            payload = verify_decode_jwt(token, timer)
+            with timer.stage('permissions'):
+                check_permissions(permission, payload)
+            with timer.stage('identity'):
+                user_identity = get_user_identity(payload)
             return f( user_identity, *args, **kwargs, )
         return wrapper
     return requires_auth_decorator
@@ -0,0 +1,218 @@
+'''
+    JWKS key store - keeps the Auth0 /.well-known/jwks.json document in process memory
+    so that verifying a token does not require a round trip to the identity provider.
+'''
+import os
+import json
+import time
+import threading
+from urllib.request import urlopen
+from jose import jwk
+
+
+JWKS_CACHE_TTL = int(os.getenv('JWKS_CACHE_TTL', 600))
+JWKS_MIN_REFRESH_INTERVAL = int(os.getenv('JWKS_MIN_REFRESH_INTERVAL', 30))
+JWKS_FETCH_TIMEOUT = float(os.getenv('JWKS_FETCH_TIMEOUT', 3))
+JWKS_FAILURE_THRESHOLD = int(os.getenv('JWKS_FAILURE_THRESHOLD', 3))
+JWKS_CIRCUIT_COOLDOWN = int(os.getenv('JWKS_CIRCUIT_COOLDOWN', 60))
+
+## jwk fields that make up the key material, a key is only rebuilt when one of them changes
+KEY_MATERIAL_FIELDS = ('kty', 'alg', 'n', 'e')
+
+
+'''
+JWKSUnavailableError Exception
+Raised when no key set has ever been fetched and the identity provider can not be reached
+'''
+class JWKSUnavailableError(Exception):
+    pass
+
+
+'''
+    fetch_jwks(jwks_url) - Method to download and parse a JWKS document
+    It gives up after JWKS_FETCH_TIMEOUT seconds and returns the decoded json document which is expected to contain a 'keys' list
+'''
+def fetch_jwks(jwks_url):
+    json_url = urlopen(jwks_url, timeout=JWKS_FETCH_TIMEOUT)
+    return json.loads(json_url.read())
+
+
+'''
+    load_jwks_file(jwks_file) - Method to read a JWKS document from a local file (offline mode)
+'''
+def load_jwks_file(jwks_file):
+    with open(jwks_file) as json_file:
+        return json.load(json_file)
+
+
+'''
+    JWKSKeyStore - In-process cache of the signing keys published by the identity provider
+    INPUTS:
+        jwks_url: url of the jwks document
+        ttl: number of seconds after which the cached key set is considered stale and fetched again
+        min_refresh_interval: minimum number of seconds between two forced refreshes triggered by an unknown key id
+        fetch: method used to download the jwks document (defaults to fetch_jwks)
+        background_refresh: if True a daemon thread per process keeps the key set current
+        failure_threshold: number of consecutive failed fetches after which the circuit breaker opens
+        cooldown: number of seconds the circuit breaker stays open before a fetch is tried again
+    Keys are looked up by key id (kid) using get_key(kid). The key set is fetched on first use, again once
+    it is older than ttl, and again (rate limited by min_refresh_interval) when a token arrives with a key id
+    that is not in the cached set, which is what happens right after the identity provider rotates its keys.
+    Every jwk is parsed into a python-jose key object once. The object is kept across refreshes as long as
+    the identity provider keeps publishing the same key material under the same kid.
+    Only the very first fetch blocks a request. After that a stale key set keeps being served while the
+    refresh runs in the background or keeps failing. While the circuit breaker is open no fetch is attempted
+    at all, so an unreachable identity provider does not add its timeout to every request.
+'''
+class JWKSKeyStore(object):
+
+    def __init__(self, jwks_url, ttl=JWKS_CACHE_TTL, min_refresh_interval=JWKS_MIN_REFRESH_INTERVAL, fetch=fetch_jwks,
+                 background_refresh=False, failure_threshold=JWKS_FAILURE_THRESHOLD, cooldown=JWKS_CIRCUIT_COOLDOWN):
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.fetch = fetch
+        self.background_refresh = background_refresh
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self._circuit_open_until = None
+        self._keys = {}
+        self._jwks = {}
+        self._fetched_at = None
+        self._last_forced_refresh = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._refresher_pid = None
+
+    '''
+    is_expired() - returns True if the key set was never fetched or is older than ttl
+    '''
+    def is_expired(self):
+        return self._fetched_at is None or time.monotonic() - self._fetched_at >= self.ttl
+
+    '''
+    is_circuit_open() - returns True while fetches are suspended after repeated failures
+    '''
+    def is_circuit_open(self):
+        return self._circuit_open_until is not None and time.monotonic() < self._circuit_open_until
+
+    '''
+    _construct_key(key) - parses a jwk (dict) into a key object that can verify signatures
+    It returns None for keys that python-jose can not use, such keys are skipped.
+    '''
+    def _construct_key(self, key):
+        try:
+            return jwk.construct(key, key.get('alg', 'RS256'))
+        except Exception:
+            return None
+
+    '''
+    refresh() - downloads the jwks document and replaces the cached key set
+    A failed download leaves the cached key set untouched, counts towards the circuit breaker and is re-raised.
+    '''
+    def refresh(self):
+        with self._refresh_lock:
+            try:
+                jwks_reference = self.fetch(self.jwks_url)
+            except Exception:
+                with self._lock:
+                    self.consecutive_failures += 1
+                    if self.consecutive_failures >= self.failure_threshold:
+                        self._circuit_open_until = time.monotonic() + self.cooldown
+                raise
+
+            keys = {}
+            jwks = {}
+            for key in jwks_reference['keys']:
+                kid = key.get('kid')
+                material = tuple(key.get(field) for field in KEY_MATERIAL_FIELDS)
+                if kid in self._jwks and self._jwks[kid] == material:
+                    key_object = self._keys[kid]
+                else:
+                    key_object = self._construct_key(key)
+                if key_object is not None:
+                    keys[kid] = key_object
+                    jwks[kid] = material
+            with self._lock:
+                self._keys = keys
+                self._jwks = jwks
+                self._fetched_at = time.monotonic()
+                self.consecutive_failures = 0
+                self._circuit_open_until = None
+
+    '''
+    try_refresh() - refreshes the key set unless the circuit breaker is open
+    It returns True if a new key set was fetched, failures are swallowed so that the stale key set keeps being served.
+    '''
+    def try_refresh(self):
+        if self.is_circuit_open():
+            return False
+        try:
+            self.refresh()
+            return True
+        except Exception:
+            return False
+
+    '''
+    _run_refresher() - body of the background thread, refreshes the key set every ttl seconds
+    or as soon as a request finds the key set stale
+    '''
+    def _run_refresher(self):
+        while True:
+            self._wakeup.wait(self.cooldown if self.consecutive_failures else self.ttl)
+            self._wakeup.clear()
+            if self.is_expired() or self.consecutive_failures:
+                self.try_refresh()
+
+    '''
+    _ensure_refresher() - starts the background thread once per process
+    The process id is checked so that gunicorn workers forked after the first request get their own thread.
+    '''
+    def _ensure_refresher(self):
+        if not self.background_refresh or self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+            refresher = threading.Thread(target=self._run_refresher, name='jwks-refresher', daemon=True)
+            refresher.start()
+
+    '''
+    _can_force_refresh() - rate limits refreshes triggered by unknown key ids so that tokens
+    with made up key ids can not be used to hammer the identity provider
+    '''
+    def _can_force_refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._last_forced_refresh is not None and now - self._last_forced_refresh < self.min_refresh_interval:
+                return False
+            self._last_forced_refresh = now
+            return True
+
+    '''
+    get_key(kid) - returns the key object for the given key id or None if the key id is not published
+    It raises a JWKSUnavailableError if no key set could ever be fetched.
+    '''
+    def get_key(self, kid):
+        self._ensure_refresher()
+
+        refreshed = False
+        if self._fetched_at is None:
+            if not self.try_refresh() and self._fetched_at is None:
+                raise JWKSUnavailableError('Unable to fetch ' + str(self.jwks_url))
+            refreshed = True
+        elif self.is_expired():
+            if self.background_refresh:
+                self._wakeup.set()
+            else:
+                refreshed = self.try_refresh()
+
+        key = self._keys.get(kid)
+        if key is None and not refreshed and self._can_force_refresh():
+            self.try_refresh()
+            key = self._keys.get(kid)
+
+        return key
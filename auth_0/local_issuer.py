@@ -0,0 +1,114 @@
+'''
+    Local token issuer - mints RS256 tokens that look like the Auth0 tokens of this app
+    so that the api can be tested and load tested without network access or live Auth0 accounts.
+
+    Example usage from the command line (prints a token and writes the public keys to jwks.json):
+        python -m auth_0.local_issuer --key-file local_key.pem --jwks-file jwks.json --username student_1 --permissions read:student,post:student
+    Start the server with JWKS_FILE=jwks.json to accept the minted tokens.
+'''
+import os
+import json
+import time
+import argparse
+import rsa
+from jose import jwt
+from jose.utils import long_to_base64
+
+from auth_0.auth import AUTH0_ISSUER, API_AUDIENCE, USERNAME_CLAIM
+
+
+'''
+    LocalTokenIssuer - RSA key pair that signs tokens and publishes the matching jwks document
+    INPUTS:
+        private_key: rsa.PrivateKey used for signing, a new key pair of key_size bits is generated if not given
+        kid: key id written into the token header and the jwks document
+        issuer: 'iss' claim of minted tokens (defaults to the issuer the app verifies)
+        audience: 'aud' claim of minted tokens (defaults to API_AUDIENCE, left out if not set)
+'''
+class LocalTokenIssuer(object):
+
+    def __init__(self, private_key=None, kid='local-key', key_size=2048, issuer=AUTH0_ISSUER, audience=API_AUDIENCE):
+        if private_key is None:
+            public_key, private_key = rsa.newkeys(key_size)
+        self.private_key = private_key
+        self.kid = kid
+        self.issuer = issuer
+        self.audience = audience
+        self._private_pem = private_key.save_pkcs1().decode('ascii')
+
+    '''
+    load(key_file) - returns an issuer that signs with the PEM private key stored in key_file,
+    the key file is created with a new key pair if it does not exist yet
+    '''
+    @classmethod
+    def load(cls, key_file, **kwargs):
+        if not os.path.exists(key_file):
+            issuer = cls(**kwargs)
+            with open(key_file, 'wb') as pem_file:
+                pem_file.write(issuer.private_key.save_pkcs1())
+            return issuer
+
+        with open(key_file, 'rb') as pem_file:
+            return cls(private_key=rsa.PrivateKey.load_pkcs1(pem_file.read()), **kwargs)
+
+    '''
+    jwks() - returns the jwks document holding the public key of the issuer
+    '''
+    def jwks(self):
+        return {
+            'keys': [{
+                'kid': self.kid,
+                'kty': 'RSA',
+                'alg': 'RS256',
+                'use': 'sig',
+                'n'  : long_to_base64(self.private_key.n).decode('ascii'),
+                'e'  : long_to_base64(self.private_key.e).decode('ascii')
+            }]
+        }
+
+    '''
+    save_jwks(jwks_file) - writes the jwks document to a file that can be used as JWKS_FILE
+    '''
+    def save_jwks(self, jwks_file):
+        with open(jwks_file, 'w') as json_file:
+            json.dump(self.jwks(), json_file)
+
+    '''
+    mint_token(username, permissions, expires_in) - returns a signed token for the given username with the given permissions
+    INPUTS:
+        username: value of the https://anusha.example.com/username claim which the app uses as user id
+        permissions: list of permission strings (i.e. ['read:student'])
+        expires_in: number of seconds the token is valid for
+        claims: any additional claims to put into the token
+    '''
+    def mint_token(self, username, permissions, expires_in=3600, **claims):
+        now = int(time.time())
+        payload = {
+            USERNAME_CLAIM: username,
+            'iss'         : self.issuer,
+            'sub'         : 'local|' + username,
+            'iat'         : now,
+            'exp'         : now + expires_in,
+            'permissions' : list(permissions)
+        }
+        if self.audience is not None:
+            payload['aud'] = self.audience
+        payload.update(claims)
+
+        return jwt.encode(payload, self._private_pem, algorithm='RS256', headers={'kid': self.kid})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mint a token signed by a local key')
+    parser.add_argument('--key-file', required=True, help='PEM private key, created if it does not exist')
+    parser.add_argument('--jwks-file', help='file to write the public jwks document to')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--permissions', default='', help='comma separated permissions')
+    parser.add_argument('--expires-in', type=int, default=3600)
+    args = parser.parse_args()
+
+    issuer = LocalTokenIssuer.load(args.key_file)
+    if args.jwks_file:
+        issuer.save_jwks(args.jwks_file)
+    permissions = [permission for permission in args.permissions.split(',') if permission]
+    print(issuer.mint_token(args.username, permissions, expires_in=args.expires_in))
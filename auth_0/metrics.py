@@ -0,0 +1,118 @@
+'''
+    Auth timing metrics - per stage latency histograms of requires_auth, recorded per permission string
+'''
+import time
+import threading
+from contextlib import contextmanager
+
+
+## Upper bounds of the histogram buckets in milliseconds, slower observations go to the overflow bucket
+LATENCY_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+'''
+    LatencyHistogram - fixed bucket histogram of latencies in milliseconds
+'''
+class LatencyHistogram(object):
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms):
+        index = len(self.buckets)
+        for position, upper_bound in enumerate(self.buckets):
+            if value_ms <= upper_bound:
+                index = position
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    '''
+    format() - representation of the histogram, buckets are [upper bound in ms, count] pairs with None as the overflow bound
+    '''
+    def format(self):
+        return {
+            'count'  : self.count,
+            'sum_ms' : round(self.sum_ms, 3),
+            'max_ms' : round(self.max_ms, 3),
+            'buckets': [[upper_bound, count] for upper_bound, count in zip(list(self.buckets) + [None], self.counts)]
+        }
+
+
+'''
+    AuthTimings - registry of latency histograms keyed by (permission, stage)
+    Stages recorded by requires_auth: header, token_cache, jwks, signature, permissions, identity
+'''
+class AuthTimings(object):
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, permission, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get((permission, stage))
+            if histogram is None:
+                histogram = self._histograms[(permission, stage)] = LatencyHistogram()
+            histogram.observe(seconds * 1000)
+
+    '''
+    timer(permission) - returns a StageTimer that records into this registry under the given permission
+    '''
+    def timer(self, permission):
+        return StageTimer(self, permission)
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    '''
+    format() - representation of all histograms as {permission: {stage: histogram}}
+    '''
+    def format(self):
+        with self._lock:
+            timings = {}
+            for (permission, stage), histogram in self._histograms.items():
+                timings.setdefault(permission, {})[stage] = histogram.format()
+            return timings
+
+
+'''
+    StageTimer - measures the stages of one authorization
+    Example usage:
+                timer = auth_timings.timer('read:student')
+                with timer.stage('header'):
+                    token = get_token_auth_header()
+'''
+class StageTimer(object):
+
+    def __init__(self, registry, permission):
+        self.registry = registry
+        self.permission = permission
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registry.record(self.permission, name, time.perf_counter() - start)
+
+
+'''
+    NullStageTimer - stage timer that records nothing, used when verify_decode_jwt is called outside requires_auth
+'''
+class NullStageTimer(object):
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+
+NULL_TIMER = NullStageTimer()
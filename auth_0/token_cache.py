@@ -0,0 +1,81 @@
+'''
+    Verified token cache - remembers the decoded payload of tokens that have already been verified
+    so that a client sending the same bearer token again does not pay for the signature check.
+'''
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 1024))
+
+
+'''
+    TokenCache - bounded LRU of verified token payloads
+    INPUTS:
+        maxsize: maximum number of tokens kept, the least recently used token is evicted first
+    Entries are keyed by the sha256 digest of the token so raw tokens are never kept in memory and
+    every entry is dropped once the 'exp' claim of its token has passed. Tokens without an 'exp'
+    claim are never cached. hits and misses count the lookups made with get(token).
+'''
+class TokenCache(object):
+
+    def __init__(self, maxsize=TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    '''
+    get(token) - returns the cached payload of the token or None if the token is unknown or expired
+    '''
+    def get(self, token):
+        digest = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                payload, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    return payload
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+    '''
+    put(token, payload) - caches the verified payload of the token until its 'exp' claim
+    '''
+    def put(self, token, payload):
+        if self.maxsize <= 0 or not isinstance(payload.get('exp'), (int, float)):
+            return
+        digest = self._digest(token)
+        with self._lock:
+            self._entries[digest] = (payload, payload['exp'])
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    '''
+    clear() - drops all cached tokens
+    '''
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    '''
+    stats() - returns the hit and miss counters along with the current number of cached tokens
+    '''
+    def stats(self):
+        with self._lock:
+            return {
+                'hits'   : self.hits,
+                'misses' : self.misses,
+                'size'   : len(self._entries)
+            }
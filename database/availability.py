@@ -0,0 +1,67 @@
+'''
+Weekly availability helpers.
+
+A time slot is written as "<day> <start>-<end>" with a three letter day and 24 hour times, i.e. "Tue 16:00-18:00".
+Mentor availability is stored as one row per weekday interval (day_of_week 0=Mon .. 6=Sun, minutes since midnight),
+slots crossing midnight are split at the day boundary and overlapping or touching intervals are merged, so that
+"is the mentor available for the whole slot" is a containment test against a single stored interval.
+'''
+import re
+
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MINUTES_PER_DAY = 24 * 60
+
+SLOT_PATTERN = re.compile(r'^\s*([A-Za-z]{3})[a-z]*\s+(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$')
+
+
+def _minutes(hours, minutes):
+  hours, minutes = int(hours), int(minutes)
+  if minutes >= 60 or hours > 24 or (hours == 24 and minutes != 0):
+    raise ValueError('invalid time')
+  return hours * 60 + minutes
+
+'''
+parse_slot(text): returns (day_of_week, start_minute, end_minute) of a slot like "Tue 16:00-18:00".
+end_minute is smaller than or equal to start_minute for a slot that ends on the next day. Raises ValueError for malformed slots.
+'''
+def parse_slot(text):
+  match = SLOT_PATTERN.match(text) if isinstance(text, str) else None
+  if match is None or match.group(1).lower() not in DAYS:
+    raise ValueError('invalid time slot')
+  start_minute = _minutes(match.group(2), match.group(3))
+  end_minute = _minutes(match.group(4), match.group(5))
+  if start_minute == MINUTES_PER_DAY or start_minute == end_minute:
+    raise ValueError('empty time slot')
+  return DAYS.index(match.group(1).lower()), start_minute, end_minute
+
+'''
+parse_availability(slots): returns the merged weekday intervals [(day_of_week, start_minute, end_minute)] of a list of slots
+'''
+def parse_availability(slots):
+  if not isinstance(slots, list):
+    raise ValueError('availability must be a list of time slots')
+  intervals = []
+  for slot in slots:
+    day, start_minute, end_minute = parse_slot(slot)
+    if end_minute > start_minute:
+      intervals.append((day, start_minute, end_minute))
+    else:
+      intervals.append((day, start_minute, MINUTES_PER_DAY))
+      if end_minute > 0:
+        intervals.append(((day + 1) % len(DAYS), 0, end_minute))
+
+  merged = []
+  for day, start_minute, end_minute in sorted(intervals):
+    if merged and merged[-1][0] == day and start_minute <= merged[-1][2]:
+      merged[-1] = (day, merged[-1][1], max(merged[-1][2], end_minute))
+    else:
+      merged.append((day, start_minute, end_minute))
+  return merged
+
+'''
+format_slot(day_of_week, start_minute, end_minute): inverse of parse_slot for a single day interval
+'''
+def format_slot(day_of_week, start_minute, end_minute):
+  return '{} {:02d}:{:02d}-{:02d}:{:02d}'.format(DAYS[day_of_week].capitalize(), start_minute // 60, start_minute % 60,
+                                                 end_minute // 60, end_minute % 60)
@@ -0,0 +1,65 @@
+'''
+CourseCatalogSnapshot: per process copy of the course_catalog table served by GET /courses.
+
+The snapshot is loaded on first use and reloaded once it is older than COURSE_CATALOG_TTL seconds. A commit that
+changes the catalog drops the snapshot of the process that made it right away, the TTL bounds how long catalog
+changes committed by other worker processes can stay invisible.
+Each snapshot carries a strong ETag, the digest of its content, so a conditional GET /courses is answered from memory.
+'''
+import os
+import json
+import time
+import hashlib
+import threading
+
+
+COURSE_CATALOG_TTL = int(os.getenv('COURSE_CATALOG_TTL', 30))
+
+
+'''
+catalog_etag(courses): ETag value of a catalog, equal catalogs get the same ETag in every process
+'''
+def catalog_etag(courses):
+  return hashlib.sha1(json.dumps(courses, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+class CourseCatalogSnapshot(object):
+
+  def __init__(self, ttl=COURSE_CATALOG_TTL):
+    self.ttl = ttl
+    self._lock = threading.Lock()
+    self._courses = None
+    self._etag = None
+    self._loaded_at = None
+    self._generation = 0
+
+  '''
+  get(load): returns the snapshot and its ETag, calling load() to read the catalog from the database if the snapshot is missing or too old
+  '''
+  def get(self, load):
+    with self._lock:
+      if self._courses is not None and time.monotonic() - self._loaded_at < self.ttl:
+        return self._courses, self._etag
+      generation = self._generation
+
+    courses = load()
+    etag = catalog_etag(courses)
+    with self._lock:
+      # a snapshot read while a catalog change committed may already be out of date, it is served but not kept
+      if generation == self._generation:
+        self._courses = courses
+        self._etag = etag
+        self._loaded_at = time.monotonic()
+    return courses, etag
+
+  '''
+  invalidate(): drops the snapshot, the next get() reads the catalog again
+  '''
+  def invalidate(self):
+    with self._lock:
+      self._generation += 1
+      self._courses = None
+
+
+## Snapshot shared by all requests handled by this process
+course_catalog_snapshot = CourseCatalogSnapshot()
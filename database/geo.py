@@ -0,0 +1,139 @@
+'''
+Geo helpers for the proximity search of mentors.
+
+Cities are geocoded with the bundled offline gazetteer (database/gazetteer.csv), so saving a student or a mentor
+never calls an external service. Mentors are indexed by the geohash cell of their coordinates, a radius search
+reads the few cells covering the search circle and only computes exact distances for the mentors found in them.
+'''
+import os
+import csv
+import math
+
+
+GAZETTEER_FILE = os.getenv('GAZETTEER_FILE', os.path.join(os.path.dirname(__file__), 'gazetteer.csv'))
+
+## Geohash length stored in mentors.geo_cell, a cell of length 4 is about 39 km wide and 19.5 km high
+GEO_CELL_PRECISION = 4
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.2
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+STATE_CODES = {
+  'alabama': 'al', 'alaska': 'ak', 'arizona': 'az', 'arkansas': 'ar', 'california': 'ca', 'colorado': 'co',
+  'connecticut': 'ct', 'delaware': 'de', 'district of columbia': 'dc', 'florida': 'fl', 'georgia': 'ga', 'hawaii': 'hi',
+  'idaho': 'id', 'illinois': 'il', 'indiana': 'in', 'iowa': 'ia', 'kansas': 'ks', 'kentucky': 'ky', 'louisiana': 'la',
+  'maine': 'me', 'maryland': 'md', 'massachusetts': 'ma', 'michigan': 'mi', 'minnesota': 'mn', 'mississippi': 'ms',
+  'missouri': 'mo', 'montana': 'mt', 'nebraska': 'ne', 'nevada': 'nv', 'new hampshire': 'nh', 'new jersey': 'nj',
+  'new mexico': 'nm', 'new york': 'ny', 'north carolina': 'nc', 'north dakota': 'nd', 'ohio': 'oh', 'oklahoma': 'ok',
+  'oregon': 'or', 'pennsylvania': 'pa', 'rhode island': 'ri', 'south carolina': 'sc', 'south dakota': 'sd',
+  'tennessee': 'tn', 'texas': 'tx', 'utah': 'ut', 'vermont': 'vt', 'virginia': 'va', 'washington': 'wa',
+  'west virginia': 'wv', 'wisconsin': 'wi', 'wyoming': 'wy'
+}
+
+_gazetteer = None
+
+
+def _place_key(city, state):
+  state = (state or '').strip().lower()
+  return ((city or '').strip().lower(), STATE_CODES.get(state, state))
+
+def load_gazetteer(gazetteer_file=GAZETTEER_FILE):
+  places = {}
+  with open(gazetteer_file, newline='') as csv_file:
+    for row in csv.DictReader(csv_file):
+      places[_place_key(row['city'], row['state'])] = (float(row['latitude']), float(row['longitude']))
+  return places
+
+'''
+geocode(city, state): returns the (latitude, longitude) of a city from the gazetteer or None if the city is not listed.
+state can be given as the two letter code or the full name, both are matched case insensitive.
+'''
+def geocode(city, state):
+  global _gazetteer
+  if _gazetteer is None:
+    _gazetteer = load_gazetteer()
+  return _gazetteer.get(_place_key(city, state))
+
+'''
+geohash_encode(latitude, longitude, precision): returns the geohash of a point
+'''
+def geohash_encode(latitude, longitude, precision=GEO_CELL_PRECISION):
+  lat_range = [-90.0, 90.0]
+  lon_range = [-180.0, 180.0]
+  geohash = []
+  bits = 0
+  bit_count = 0
+  even = True
+  while len(geohash) < precision:
+    value, value_range = (longitude, lon_range) if even else (latitude, lat_range)
+    middle = (value_range[0] + value_range[1]) / 2
+    bits <<= 1
+    if value >= middle:
+      bits |= 1
+      value_range[0] = middle
+    else:
+      value_range[1] = middle
+    even = not even
+    bit_count += 1
+    if bit_count == 5:
+      geohash.append(GEOHASH_ALPHABET[bits])
+      bits = 0
+      bit_count = 0
+  return ''.join(geohash)
+
+'''
+cell_size(precision): returns the (height, width) in degrees of a geohash cell
+'''
+def cell_size(precision=GEO_CELL_PRECISION):
+  lon_bits = (5 * precision + 1) // 2
+  lat_bits = (5 * precision) // 2
+  return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+'''
+covering_cells(latitude, longitude, radius_km, precision): returns the geohash cells of the bounding box of a circle,
+every point within radius_km of the center lies in one of them
+'''
+def covering_cells(latitude, longitude, radius_km, precision=GEO_CELL_PRECISION):
+  height, width = cell_size(precision)
+  lat_delta = radius_km / KM_PER_DEGREE
+  lat_min = max(latitude - lat_delta, -90.0)
+  lat_max = min(latitude + lat_delta, 90.0 - height / 2)
+
+  cos_lat = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+  lon_columns = int(1 << ((5 * precision + 1) // 2))
+  if cos_lat * KM_PER_DEGREE * 180.0 <= radius_km:
+    lon_indexes = range(lon_columns)
+  else:
+    lon_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+    first = int(math.floor((longitude - lon_delta + 180.0) / width))
+    last = int(math.floor((longitude + lon_delta + 180.0) / width))
+    lon_indexes = [index % lon_columns for index in range(first, last + 1)]
+
+  cells = set()
+  for lat_index in range(int(math.floor((lat_min + 90.0) / height)), int(math.floor((lat_max + 90.0) / height)) + 1):
+    cell_latitude = -90.0 + (lat_index + 0.5) * height
+    for lon_index in lon_indexes:
+      cells.add(geohash_encode(cell_latitude, -180.0 + (lon_index + 0.5) * width, precision))
+  return cells
+
+'''
+distance_km(latitude1, longitude1, latitude2, longitude2): great circle distance between two points in kilometers
+'''
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+  phi1 = math.radians(latitude1)
+  phi2 = math.radians(latitude2)
+  half_dphi = math.radians(latitude2 - latitude1) / 2
+  half_dlambda = math.radians(longitude2 - longitude1) / 2
+  a = math.sin(half_dphi) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(half_dlambda) ** 2
+  return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+'''
+locate(city, state): returns the (latitude, longitude, geo_cell) stored on a student or mentor, all None for unknown cities
+'''
+def locate(city, state):
+  coordinates = geocode(city, state)
+  if coordinates is None:
+    return None, None, None
+  return coordinates[0], coordinates[1], geohash_encode(coordinates[0], coordinates[1])
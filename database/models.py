@@ -1,16 +1,42 @@
 import os
-from sqlalchemy import Column, String, Integer, Boolean, ForeignKey, create_engine, Numeric, func
+from sqlalchemy import Column, String, Integer, BigInteger, Float, Boolean, ForeignKey, Index, Computed, create_engine, Numeric, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import relationship, backref
-from sqlalchemy_utils import aggregated
+from sqlalchemy.orm import relationship, backref, column_property
+from sqlalchemy import event, inspect, text
 import json
+import time
+
+from database.search_index import mentor_search_index
+from database.geo import locate
+from database.search_cache import search_result_cache, location_key
+from database.availability import format_slot
+from database.course_catalog import course_catalog_snapshot
+from collections import Counter
 
 database_path = os.getenv('DATABASE_URL')
 
 db = SQLAlchemy()
 
+'''
+Full-text search: mentors and courses carry a tsvector generated by Postgres (12 or newer) from their text columns,
+so the vectors can never get out of date with the row. The weights rank a match in the course name (A) above a match
+in the qualification (B) and the additional qualification (C).
+'''
+TEXT_SEARCH_CONFIG = 'english'
+MENTOR_SEARCH_VECTOR = ("setweight(to_tsvector('{0}', coalesce(qualification, '')), 'B') || "
+                        "setweight(to_tsvector('{0}', coalesce(add_qualification, '')), 'C')").format(TEXT_SEARCH_CONFIG)
+COURSE_SEARCH_VECTOR = "setweight(to_tsvector('{0}', coalesce(name, '')), 'A')".format(TEXT_SEARCH_CONFIG)
+
+'''
+initial_mentor_version(): first version of a new mentor row, the creation time in milliseconds so that a mentor that is
+deleted and signs up again with the same userid never reuses the version (and ETag) of its old profile
+'''
+def initial_mentor_version():
+  return int(time.time() * 1000)
+
 '''
 setup_db(app) : binds flask application and SQLAlchemy
 '''
@@ -35,6 +61,8 @@ class Student(db.Model):
   address = Column(String, nullable=False) #String address
   city = Column(String, nullable=False) #String city
   state = Column(String, nullable=False) #String state
+  latitude = Column(Float) # Float latitude of the city, geocoded from the gazetteer (None if the city is not listed)
+  longitude = Column(Float) # Float longitude of the city
   
   ''' init function '''
   def __init__(self, userid, name, grade, address, city, state):
@@ -44,6 +72,12 @@ class Student(db.Model):
     self.address = address
     self.city = city
     self.state = state
+
+  '''
+  locate(): geocodes city and state into latitude and longitude, called by insert() and update()
+  '''
+  def locate(self):
+    self.latitude, self.longitude, _ = locate(self.city, self.state)
   
   '''
   insert(): inserts a new model into a database
@@ -52,6 +86,7 @@ class Student(db.Model):
                 student.insert()
   '''  
   def insert(self):
+    self.locate()
     db.session.add(self)
     db.session.commit()
 
@@ -65,6 +100,7 @@ class Student(db.Model):
                 student.update()
   '''    
   def update(self):
+    self.locate()
     db.session.commit()
 
   '''
@@ -119,8 +155,25 @@ class Mentor(db.Model):
   is_volunteer = Column(Boolean, default=False) # Boolean value representing if the mentor is willing to volunteer in case a student is in need
   price = Column(Integer) #Price per hour that the mentor charges
   avail_time = Column(String) # Mentor available times as string
+  latitude = Column(Float) # Float latitude of the city, geocoded from the gazetteer (None if the city is not listed)
+  longitude = Column(Float) # Float longitude of the city
+  geo_cell = Column(String(12)) # Geohash cell of the coordinates, used by the proximity search
+  search_vector = Column(TSVECTOR, Computed(MENTOR_SEARCH_VECTOR, persisted=True)) # Generated tsvector of the qualifications for full-text search
+  version = Column(BigInteger, nullable=False, default=initial_mentor_version, server_default='1') # Version of the profile, bumped by the session events on every change, used for ETags
+  rating_sum = Column(Integer, nullable=False, default=0, server_default='0') # Sum of the ratings of all feedback, maintained by the session events
+  rating_count = Column(Integer, nullable=False, default=0, server_default='0') # Number of feedback received, maintained by the session events
   offer_courses = relationship('MentorCourse', backref="my_mentors", cascade="all, delete-orphan", lazy=True) #Courses that the mentor is offering
   feedback = relationship('Feedback', backref='mentor_feedback', cascade="all, delete-orphan", lazy=True) #Student feedback and rating to the mentor
+  availability = relationship('MentorAvailability', backref='mentor', cascade="all, delete-orphan", lazy=True,
+                              order_by='(MentorAvailability.day_of_week, MentorAvailability.start_minute)') #Weekly time intervals the mentor is available
+
+  # Mentor search matches lower(state) and lower(city), the expression index lets it use an index range scan
+  __table_args__ = (
+    Index('ix_mentors_lower_state_city', func.lower(state), func.lower(city)),
+    # Proximity search reads the mentors of the geohash cells around the student
+    Index('ix_mentors_geo_cell', geo_cell),
+    Index('ix_mentors_search_vector', search_vector, postgresql_using='gin'),
+  )
 
   ''' init function '''
   def __init__(self, userid, name, address, city, state, qualification, add_qualification, price, avail_time, is_volunteer):
@@ -135,6 +188,12 @@ class Mentor(db.Model):
     self.price = price
     self.avail_time = avail_time
 
+  '''
+  locate(): geocodes city and state into latitude, longitude and geo_cell, called by insert() and update()
+  '''
+  def locate(self):
+    self.latitude, self.longitude, self.geo_cell = locate(self.city, self.state)
+
   '''
   insert(): inserts a new model into a database
   Example usage:
@@ -143,8 +202,10 @@ class Mentor(db.Model):
                 mentor.insert()
   '''  
   def insert(self):
+    self.locate()
     db.session.add(self)
     db.session.commit()
+    mentor_search_index.upsert_mentor(self)
  
   '''
   update(): updates an existing model in database
@@ -156,7 +217,9 @@ class Mentor(db.Model):
                 mentor.update()
   '''  
   def update(self):
+    self.locate()
     db.session.commit()
+    mentor_search_index.upsert_mentor(self)
 
   '''
   delete(): deletes an existing model from database
@@ -165,8 +228,10 @@ class Mentor(db.Model):
                 mentor.delete()
   '''
   def delete(self):
+    mentor_id = self.userid
     db.session.delete(self)
     db.session.commit()
+    mentor_search_index.remove_mentor(mentor_id)
 
   '''
   Representation of the mentor model with all the entities
@@ -185,6 +250,14 @@ class Mentor(db.Model):
         'availTime'        : self.avail_time
       }
   
+  '''
+  average_rating(): average rating of all feedback from rating_sum and rating_count, 0 without feedback
+  '''
+  def average_rating(self):
+    if not self.rating_count:
+      return 0
+    return self.rating_sum / self.rating_count
+
   '''
   Representation of the mentor model excluding the address
   '''
@@ -212,6 +285,13 @@ class MentorCourse(db.Model):
   name = Column(String, nullable = False) # String name of the course
   grade = Column(Integer, nullable=False) # Integer grade for which this course is offered (1-12)
   mentor_id = Column(String, ForeignKey('mentors.userid'), nullable=False) # Foreign Key mentor_id
+  search_vector = Column(TSVECTOR, Computed(COURSE_SEARCH_VECTOR, persisted=True)) # Generated tsvector of the course name for full-text search
+
+  # Joins from mentors to their courses of a grade (mentor search) and lookups of a mentor's courses
+  __table_args__ = (
+    Index('ix_mentor_courses_mentor_id_grade', mentor_id, grade),
+    Index('ix_mentor_courses_search_vector', search_vector, postgresql_using='gin'),
+  )
 
   ''' init function '''
   def __init__(self, name, grade, mentor_id):
@@ -228,6 +308,7 @@ class MentorCourse(db.Model):
   def insert(self):
     db.session.add(self)
     db.session.commit()
+    mentor_search_index.upsert_course(self)
 
   '''
   update(): updates an existing model in database
@@ -240,6 +321,7 @@ class MentorCourse(db.Model):
   '''   
   def update(self):
     db.session.commit()
+    mentor_search_index.upsert_course(self)
 
   '''
   delete(): deletes an existing model from database
@@ -248,8 +330,10 @@ class MentorCourse(db.Model):
                 course.delete()
   '''
   def delete(self):
+    course_id = self.id
     db.session.delete(self)
     db.session.commit()
+    mentor_search_index.remove_course(course_id)
 
   '''
   Representation of the mentor_courses model
@@ -262,6 +346,37 @@ class MentorCourse(db.Model):
         'mentor_id': self.mentor_id
       }
 
+'''
+MentorAvailability: Represents a weekly time interval in which a mentor is available, see database/availability.py
+'''
+class MentorAvailability(db.Model):
+  __tablename__ = 'mentor_availabilities'
+
+  id = Column(Integer, primary_key=True)  # autoincrementing, unique primary key
+  mentor_id = Column(String, ForeignKey('mentors.userid'), nullable=False) # Foreign Key mentor_id
+  day_of_week = Column(Integer, nullable=False) # Integer day of the week (0=Monday .. 6=Sunday)
+  start_minute = Column(Integer, nullable=False) # Integer start of the interval in minutes since midnight
+  end_minute = Column(Integer, nullable=False) # Integer end of the interval in minutes since midnight (up to 1440)
+
+  # Interval index: a time filter is a range scan on (day_of_week, start_minute <= slot start) checking end_minute >= slot end in the index
+  __table_args__ = (
+    Index('ix_mentor_availabilities_day_start_end', day_of_week, start_minute, end_minute),
+    Index('ix_mentor_availabilities_mentor_id', mentor_id),
+  )
+
+  ''' init function '''
+  def __init__(self, day_of_week, start_minute, end_minute, mentor_id=None):
+    self.day_of_week = day_of_week
+    self.start_minute = start_minute
+    self.end_minute = end_minute
+    self.mentor_id = mentor_id
+
+  '''
+  Representation of the mentor_availabilities model as a time slot string, i.e. "Tue 16:00-18:00"
+  '''
+  def format(self):
+    return format_slot(self.day_of_week, self.start_minute, self.end_minute)
+
 '''
 MentorStudentPair: Represents a model which indicates if a mentor is tutoring a student or has tutored a student
 '''
@@ -275,6 +390,11 @@ class MentorStudentPair(db.Model):
   student_id = Column(String, ForeignKey(Student.userid, ondelete='SET NULL'), nullable=True)# Foreign Key student's userid
   course_id = Column(Integer, ForeignKey(MentorCourse.id, ondelete='SET NULL'), nullable=True) # Foreign Key course id
 
+  # Pages of a mentor's current or previous students on the dashboard, in id order
+  __table_args__ = (
+    Index('ix_mentor_student_pairs_mentor_id_present_student_id', mentor_id, present_student, id),
+  )
+
   '''Init function'''
   def __init__(self, mentorship_year, present_student, mentor_id, student_id, course_id): 
     self.mentorship_year = mentorship_year
@@ -336,11 +456,17 @@ class Feedback(db.Model):
   __tablename__ = 'feedbacks'
 
   id = Column(Integer, primary_key=True)  # autoincrementing, unique primary key 
-  rating = Column(Integer, nullable=False, default=5) #Integer rating (0-5)
+  # rating and mentor_id keep their old value on change (active_history) for the rating deltas of the session events
+  rating = column_property(Column(Integer, nullable=False, default=5), active_history=True) #Integer rating (0-5)
   message = Column(String) #Feedback message string
-  mentor_id = Column(String, ForeignKey(Mentor.userid, ondelete='SET NULL'), nullable=True) #foreign key mentor id
+  mentor_id = column_property(Column(String, ForeignKey(Mentor.userid, ondelete='SET NULL'), nullable=True), active_history=True) #foreign key mentor id
   student_id = Column(String, ForeignKey(Student.userid, ondelete='SET NULL'), nullable=True) #foreign key student id
 
+  # Pages of a mentor's feedbacks on the dashboard, in id order
+  __table_args__ = (
+    Index('ix_feedbacks_mentor_id_id', 'mentor_id', 'id'),
+  )
+
   '''init function'''
   def __init__(self, mentor_id, student_id, rating, message):
     self.mentor_id = mentor_id
@@ -411,6 +537,12 @@ class RequestMessage(db.Model):
   message = Column(String) # String message from student
   needs_volunteer = Column(Boolean, default=False) # Boolean representing if the student is in need
 
+  # Newest first inbox pages of a mentor, and the ON DELETE SET NULL of a deleted student or mentor
+  __table_args__ = (
+    Index('ix_request_messages_mentor_id_id', mentor_id, id.desc()),
+    Index('ix_request_messages_student_id_id', student_id, id.desc()),
+  )
+
   '''init function'''
   def __init__(self, mentor_id, student_id, course_id, message, needs_volunteer):
     self.mentor_id = mentor_id
@@ -463,6 +595,12 @@ class ReplyMessage(db.Model):
   student_id = Column(String, ForeignKey('students.userid', ondelete='SET NULL'), nullable=True)#Foreign Key student_id
   course_id = Column(Integer, ForeignKey('mentor_courses.id', ondelete='SET NULL'), nullable=True)#Foreign key couse_id
   message = Column(String)
+
+  # Newest first inbox pages of a student, and the ON DELETE SET NULL of a deleted student or mentor
+  __table_args__ = (
+    Index('ix_reply_messages_student_id_id', student_id, id.desc()),
+    Index('ix_reply_messages_mentor_id_id', mentor_id, id.desc()),
+  )
   
   '''init function'''
   def __init__(self, mentor_id, student_id, course_id, message):
@@ -552,3 +690,199 @@ class AdminMessage(db.Model):
         'student_id': self.student_id,
         'message' : self.message
       }
+
+
+'''
+CourseCatalog: distinct (name, grade) pairs of all mentor courses with the number of courses using each pair.
+The table is maintained by the session events below on every flush of MentorCourse rows, so GET /courses reads
+the catalog instead of grouping the whole mentor_courses table.
+'''
+class CourseCatalog(db.Model):
+  __tablename__ = 'course_catalog'
+
+  name = Column(String, primary_key=True) # String name of the course
+  grade = Column(Integer, primary_key=True) # Integer grade of the course
+  ref_count = Column(Integer, nullable=False, default=0) # Number of mentor courses with this name and grade
+
+  '''
+  Representation of the course_catalog model as the (name, grade) pair listed by GET /courses
+  '''
+  def format(self):
+    return [self.name, self.grade]
+
+
+'''
+Course catalog maintenance: after_flush turns the flushed MentorCourse inserts, deletes and renames into reference count
+deltas per (name, grade) and applies them in the same transaction. after_commit drops the catalog snapshot of this process.
+'''
+CATALOG_INCREMENT = text("INSERT INTO course_catalog (name, grade, ref_count) VALUES (:name, :grade, :delta) "
+                         "ON CONFLICT (name, grade) DO UPDATE SET ref_count = course_catalog.ref_count + :delta")
+CATALOG_DECREMENT = text("UPDATE course_catalog SET ref_count = ref_count - :delta WHERE name = :name AND grade = :grade")
+CATALOG_PRUNE = text("DELETE FROM course_catalog WHERE name = :name AND grade = :grade AND ref_count <= 0")
+
+def _catalog_entry(name, grade):
+  try:
+    return (name, int(grade))
+  except (TypeError, ValueError):
+    return (name, grade)
+
+def _committed_values(instance, attributes):
+  state = inspect(instance)
+  values = []
+  for attribute in attributes:
+    history = state.attrs[attribute].history
+    values.append(history.deleted[0] if history.deleted else (history.unchanged[0] if history.unchanged else getattr(instance, attribute)))
+  return values
+
+def _committed_catalog_entry(instance):
+  return _catalog_entry(*_committed_values(instance, ('name', 'grade')))
+
+def _maintain_course_catalog(session, flush_context):
+  deltas = Counter()
+  for instance in session.new:
+    if isinstance(instance, MentorCourse):
+      deltas[_catalog_entry(instance.name, instance.grade)] += 1
+  for instance in session.deleted:
+    if isinstance(instance, MentorCourse):
+      deltas[_committed_catalog_entry(instance)] -= 1
+  for instance in session.dirty:
+    if isinstance(instance, MentorCourse) and session.is_modified(instance):
+      deltas[_committed_catalog_entry(instance)] -= 1
+      deltas[_catalog_entry(instance.name, instance.grade)] += 1
+
+  # rows are updated in a fixed order so that concurrent transactions lock catalog rows in the same order
+  for (name, grade), delta in sorted(deltas.items(), key=lambda item: (str(item[0][0]), str(item[0][1]))):
+    if delta > 0:
+      session.execute(CATALOG_INCREMENT, {'name': name, 'grade': grade, 'delta': delta})
+    elif delta < 0:
+      session.execute(CATALOG_DECREMENT, {'name': name, 'grade': grade, 'delta': -delta})
+      session.execute(CATALOG_PRUNE, {'name': name, 'grade': grade})
+    if delta != 0:
+      session.info['course_catalog_changed'] = True
+
+def _refresh_course_catalog_snapshot(session):
+  if session.info.pop('course_catalog_changed', False):
+    course_catalog_snapshot.invalidate()
+
+def _discard_course_catalog_changes(session):
+  session.info.pop('course_catalog_changed', None)
+
+
+'''
+Mentor rating aggregate: after_flush turns the flushed Feedback inserts, deletes and changes into rating_sum and rating_count
+deltas per mentor and applies them in the same transaction. The columns are incremented rather than recomputed from
+feedbacks, so concurrent feedback for the same mentor cannot overwrite each other's counts.
+'''
+RATING_DELTA = text("UPDATE mentors SET rating_sum = rating_sum + :rating_delta, rating_count = rating_count + :count_delta WHERE userid = :mentor_id")
+
+def _rating_value(rating):
+  try:
+    return int(rating)
+  except (TypeError, ValueError):
+    return 0
+
+def _maintain_mentor_ratings(session, flush_context):
+  deltas = {}
+  def add(mentor_id, rating, count):
+    if mentor_id is not None:
+      delta = deltas.setdefault(mentor_id, [0, 0])
+      delta[0] += _rating_value(rating) * count
+      delta[1] += count
+
+  for instance in session.new:
+    if isinstance(instance, Feedback):
+      add(instance.mentor_id, instance.rating, 1)
+  for instance in session.deleted:
+    if isinstance(instance, Feedback):
+      add(*_committed_values(instance, ('mentor_id', 'rating')), -1)
+  for instance in session.dirty:
+    if isinstance(instance, Feedback) and session.is_modified(instance):
+      add(*_committed_values(instance, ('mentor_id', 'rating')), -1)
+      add(instance.mentor_id, instance.rating, 1)
+
+  # mentor rows are updated in a fixed order so that concurrent transactions lock them in the same order
+  for mentor_id, (rating_delta, count_delta) in sorted(deltas.items()):
+    if rating_delta != 0 or count_delta != 0:
+      session.execute(RATING_DELTA, {'mentor_id': mentor_id, 'rating_delta': rating_delta, 'count_delta': count_delta})
+
+
+'''
+Search result cache invalidation: after_flush collects the locations and grades that the flushed Mentor, MentorCourse,
+MentorAvailability and Feedback changes can affect, after_commit drops the matching cached searches and a rollback discards them.
+'''
+def _attribute_values(instance, attribute):
+  history = inspect(instance).attrs[attribute].history
+  values = set(history.added or ()) | set(history.unchanged or ()) | set(history.deleted or ())
+  if not values:
+    values = {getattr(instance, attribute)}
+  return values
+
+def _collect_search_invalidations(session, flush_context):
+  locations, grades = session.info.setdefault('search_cache_invalidations', (set(), set()))
+  for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+    if isinstance(instance, Mentor):
+      for state in _attribute_values(instance, 'state'):
+        for city in _attribute_values(instance, 'city'):
+          locations.add(location_key(city, state))
+    elif isinstance(instance, MentorCourse):
+      for grade in _attribute_values(instance, 'grade'):
+        try:
+          grades.add(int(grade))
+        except (TypeError, ValueError):
+          pass
+    elif isinstance(instance, (Feedback, MentorAvailability)):
+      for mentor_id in _attribute_values(instance, 'mentor_id'):
+        mentor_location = session.query(Mentor.city, Mentor.state).filter(Mentor.userid==mentor_id).first()
+        if mentor_location is not None:
+          locations.add(location_key(mentor_location.city, mentor_location.state))
+
+def _apply_search_invalidations(session):
+  locations, grades = session.info.pop('search_cache_invalidations', (set(), set()))
+  if locations or grades:
+    search_result_cache.invalidate(locations, grades)
+
+def _discard_search_invalidations(session):
+  session.info.pop('search_cache_invalidations', None)
+
+'''
+Mentor versions: after_flush bumps mentors.version of every mentor whose row, courses, availability, feedback or mentorship
+pairs were flushed, in the same transaction. GET /mentor_access and GET /student_access/mentors/<mentor_id> derive their
+ETag from it. Deleting a student nulls the student_id of its pairs in the database without flushing the pairs, so
+before_flush looks up the mentors of those pairs while they can still be found.
+'''
+MENTOR_VERSION_SOURCES = (MentorCourse, MentorAvailability, Feedback, MentorStudentPair)
+
+def _collect_deleted_student_mentors(session, flush_context, instances):
+  student_ids = [instance.userid for instance in session.deleted if isinstance(instance, Student)]
+  if student_ids:
+    mentor_ids = session.info.setdefault('mentor_version_bumps', set())
+    pairs = session.query(MentorStudentPair.mentor_id).filter(MentorStudentPair.student_id.in_(student_ids)).distinct().all()
+    mentor_ids.update(pair.mentor_id for pair in pairs)
+
+def _bump_mentor_versions(session, flush_context):
+  mentor_ids = session.info.pop('mentor_version_bumps', set())
+  for instance in session.dirty:
+    if isinstance(instance, Mentor) and session.is_modified(instance):
+      mentor_ids.add(instance.userid)
+  for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+    if isinstance(instance, MENTOR_VERSION_SOURCES):
+      mentor_ids.update(_attribute_values(instance, 'mentor_id'))
+  mentor_ids.discard(None)
+
+  if mentor_ids:
+    # sorted so that concurrent transactions lock the mentor rows in the same order
+    session.execute(Mentor.__table__.update().where(Mentor.userid.in_(sorted(mentor_ids))).values(version=Mentor.__table__.c.version + 1))
+
+def _discard_mentor_version_bumps(session):
+  session.info.pop('mentor_version_bumps', None)
+
+event.listen(db.session, 'after_flush', _collect_search_invalidations)
+event.listen(db.session, 'after_commit', _apply_search_invalidations)
+event.listen(db.session, 'after_rollback', _discard_search_invalidations)
+event.listen(db.session, 'after_flush', _maintain_course_catalog)
+event.listen(db.session, 'after_commit', _refresh_course_catalog_snapshot)
+event.listen(db.session, 'after_rollback', _discard_course_catalog_changes)
+event.listen(db.session, 'before_flush', _collect_deleted_student_mentors)
+event.listen(db.session, 'after_flush', _bump_mentor_versions)
+event.listen(db.session, 'after_rollback', _discard_mentor_version_bumps)
+event.listen(db.session, 'after_flush', _maintain_mentor_ratings)
@@ -0,0 +1,130 @@
+'''
+SearchResultCache: per process cache of POST /student_access/search_mentors responses.
+
+Entries are keyed by the normalized search (sort order, lowered course name, city and state, grade, cursor, limit, time slot, mode),
+evicted least recently used first and dropped after SEARCH_CACHE_TTL seconds. Writes invalidate exactly the entries
+they can change: a Mentor write drops the searches of its old and new city/state, a MentorCourse write drops the
+searches of its old and new grade and a Feedback or MentorAvailability write drops the searches of its mentor's city/state.
+The invalidations are collected by the session events registered in database/models.py and applied once the
+transaction commits. The TTL bounds how long writes handled by other worker processes can stay invisible.
+'''
+import os
+import time
+import threading
+from collections import OrderedDict
+
+
+SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', 1024))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 30))
+
+
+'''
+location_key(city, state): normalized location of a search or a mentor, the search compares lower(city) and lower(state)
+'''
+def location_key(city, state):
+  return ((state or '').lower(), (city or '').lower())
+
+
+class SearchResultCache(object):
+
+  def __init__(self, maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL):
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self.generation = 0
+    self._lock = threading.Lock()
+    self.clear()
+
+  '''
+  make_key(...): returns the cache key of a search or None if the search inputs are not plain values the cache can normalize
+  '''
+  def make_key(self, sort_by, course_name, city, state, grade, cursor, limit, slot=None, search_mode='substring'):
+    if not all(isinstance(value, str) for value in (course_name, city, state)) or isinstance(grade, (bool, float)):
+      return None
+    try:
+      grade = int(grade)
+    except (TypeError, ValueError):
+      return None
+    return (sort_by, course_name.lower()) + location_key(city, state) + (grade, cursor, limit, slot, search_mode)
+
+  '''
+  get(key): returns the cached result or None if the search is not cached or expired
+  '''
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None:
+        result, expires_at = entry
+        if expires_at > time.monotonic():
+          self._entries.move_to_end(key)
+          self.hits += 1
+          return result
+        self._discard(key)
+      self.misses += 1
+      return None
+
+  '''
+  put(key, result, generation): caches a result computed while self.generation was generation.
+  The result is dropped if an invalidation happened in between, since it may have been read before the write committed.
+  '''
+  def put(self, key, result, generation):
+    if self.maxsize <= 0 or key is None:
+      return
+    with self._lock:
+      if generation != self.generation:
+        return
+      self._discard(key)
+      self._entries[key] = (result, time.monotonic() + self.ttl)
+      self._by_location.setdefault(key[2:4], set()).add(key)
+      self._by_grade.setdefault(key[4], set()).add(key)
+      while len(self._entries) > self.maxsize:
+        self._discard(next(iter(self._entries)))
+
+  def _discard(self, key):
+    if self._entries.pop(key, None) is None:
+      return
+    for index, index_key in ((self._by_location, key[2:4]), (self._by_grade, key[4])):
+      keys = index.get(index_key)
+      if keys is not None:
+        keys.discard(key)
+        if not keys:
+          del index[index_key]
+
+  '''
+  invalidate(locations, grades): drops the cached searches of the given (state, city) locations and grades
+  '''
+  def invalidate(self, locations=(), grades=()):
+    with self._lock:
+      self.generation += 1
+      for location in locations:
+        for key in list(self._by_location.get(location, ())):
+          self._discard(key)
+      for grade in grades:
+        for key in list(self._by_grade.get(grade, ())):
+          self._discard(key)
+
+  '''
+  clear(): drops all cached searches
+  '''
+  def clear(self):
+    with self._lock:
+      self.generation += 1
+      self._entries = OrderedDict()
+      self._by_location = {}
+      self._by_grade = {}
+
+  '''
+  stats(): returns the hit and miss counters along with the current number of cached searches
+  '''
+  def stats(self):
+    with self._lock:
+      return {
+        'hits'   : self.hits,
+        'misses' : self.misses,
+        'size'   : len(self._entries)
+      }
+
+
+## Cache shared by all requests handled by this process
+search_result_cache = SearchResultCache()
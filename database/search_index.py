@@ -0,0 +1,253 @@
+'''
+MentorSearchIndex: per process in-memory index used to answer POST /student_access/search_mentors without a database round trip.
+
+Course offerings are bucketed by (lower(state), lower(city), grade) which are the equality filters of the search,
+and every bucket keeps a trigram index over the lowered course names for the substring match on the course name.
+The index is kept current by the insert()/update()/delete() methods of Mentor and MentorCourse and rebuilt from the
+database once it is older than SEARCH_INDEX_MAX_AGE seconds, which bounds how long writes handled by other worker
+processes can stay invisible. A rebuild runs in a single background thread per process (see rebuild_in_background),
+searches keep using the previous index meanwhile and the writes made during the rebuild are replayed on the new one.
+Whenever the index can not answer a query exactly like the SQL query would (index not built yet, search patterns
+containing LIKE wildcards or escapes, unusual grade values) search() returns None and the caller falls back to SQL.
+'''
+import os
+import time
+import threading
+from collections import namedtuple
+
+
+SEARCH_INDEX_ENABLED = os.getenv('SEARCH_INDEX_ENABLED', 'true').lower() == 'true'
+SEARCH_INDEX_MAX_AGE = int(os.getenv('SEARCH_INDEX_MAX_AGE', 60))
+
+## Same fields as the rows of the SQL search query so that op_format can format either
+SearchEntry = namedtuple('SearchEntry', ['mentor_id', 'time_available', 'course_name', 'course_id'])
+
+## Plain copies of the Mentor and MentorCourse columns the index uses, loaded for a rebuild and kept for the replayed writes
+IndexedMentor = namedtuple('IndexedMentor', ['userid', 'city', 'state', 'avail_time', 'offer_courses'])
+IndexedCourse = namedtuple('IndexedCourse', ['id', 'mentor_id', 'name', 'grade'])
+
+
+def trigrams(text):
+  return set(text[position:position+3] for position in range(len(text) - 2))
+
+
+class MentorSearchIndex(object):
+
+  def __init__(self, enabled=SEARCH_INDEX_ENABLED, max_age=SEARCH_INDEX_MAX_AGE):
+    self.enabled = enabled
+    self.max_age = max_age
+    self._lock = threading.RLock()
+    self._rebuilding = False
+    self._pending = []   # (method name, argument) of the writes made while a rebuild is loading
+    self.clear()
+
+  '''
+  clear(): drops the index, the next search falls back to SQL until build() is called again
+  '''
+  def clear(self):
+    with self._lock:
+      self._built_at = None
+      self._mentors = {}   # mentor_id -> {'location': (state, city), 'time_available': str, 'course_ids': set}
+      self._courses = {}   # course_id -> (bucket key, SearchEntry, lowered course name)
+      self._buckets = {}   # (state, city, grade) -> {'course_ids': set, 'trigrams': {trigram: set of course ids}}
+
+  '''
+  is_built(): True if the index can answer searches, possibly from data older than max_age while it is rebuilt
+  '''
+  def is_built(self):
+    return self.enabled and self._built_at is not None
+
+  '''
+  needs_rebuild(): True if the index is not built or older than max_age
+  '''
+  def needs_rebuild(self):
+    return self.enabled and (self._built_at is None or time.monotonic() - self._built_at >= self.max_age)
+
+  def _location(self, city, state):
+    return ((state or '').lower(), (city or '').lower())
+
+  def _add_course(self, course_id, mentor_id, name, grade):
+    mentor = self._mentors[mentor_id]
+    key = mentor['location'] + (grade,)
+    name_lower = (name or '').lower()
+    entry = SearchEntry(mentor_id, mentor['time_available'], name, course_id)
+    bucket = self._buckets.setdefault(key, {'course_ids': set(), 'trigrams': {}})
+    bucket['course_ids'].add(course_id)
+    for trigram in trigrams(name_lower):
+      bucket['trigrams'].setdefault(trigram, set()).add(course_id)
+    self._courses[course_id] = (key, entry, name_lower)
+    mentor['course_ids'].add(course_id)
+
+  def _remove_course(self, course_id):
+    key, entry, name_lower = self._courses.pop(course_id)
+    bucket = self._buckets[key]
+    bucket['course_ids'].discard(course_id)
+    for trigram in trigrams(name_lower):
+      course_ids = bucket['trigrams'].get(trigram)
+      if course_ids is not None:
+        course_ids.discard(course_id)
+        if not course_ids:
+          del bucket['trigrams'][trigram]
+    if not bucket['course_ids']:
+      del self._buckets[key]
+    mentor = self._mentors.get(entry.mentor_id)
+    if mentor is not None:
+      mentor['course_ids'].discard(course_id)
+    return key, entry
+
+  def _populate(self, mentors):
+    for mentor in mentors:
+      self._mentors[mentor.userid] = {
+        'location'      : self._location(mentor.city, mentor.state),
+        'time_available': mentor.avail_time,
+        'course_ids'    : set()
+      }
+      for course in mentor.offer_courses:
+        self._add_course(course.id, mentor.userid, course.name, course.grade)
+
+  def _fresh(self, mentors):
+    # populated without holding the lock of this index, searches are only blocked while the new index is swapped in
+    fresh = MentorSearchIndex(enabled=self.enabled, max_age=self.max_age)
+    fresh._populate(mentors)
+    return fresh
+
+  def _swap(self, fresh):
+    self._mentors, self._courses, self._buckets = fresh._mentors, fresh._courses, fresh._buckets
+    self._built_at = time.monotonic()
+
+  '''
+  build(mentors): rebuilds the index from a list of Mentor models (or IndexedMentor rows) with their offer_courses
+  '''
+  def build(self, mentors):
+    fresh = self._fresh(mentors)
+    with self._lock:
+      self._swap(fresh)
+
+  '''
+  rebuild_in_background(load): starts a thread that rebuilds the index from load(), which returns the mentors to index,
+  unless a rebuild is already running. Returns True if this call started the rebuild.
+  '''
+  def rebuild_in_background(self, load):
+    with self._lock:
+      if self._rebuilding:
+        return False
+      self._rebuilding = True
+      self._pending = []
+    threading.Thread(target=self._rebuild, args=(load,), daemon=True).start()
+    return True
+
+  def _rebuild(self, load):
+    try:
+      fresh = self._fresh(load())
+      with self._lock:
+        self._swap(fresh)
+        # writes of this process committed while load() ran may be missing from what it read
+        self._rebuilding = False
+        pending, self._pending = self._pending, []
+        for method_name, argument in pending:
+          getattr(self, method_name)(argument)
+    finally:
+      with self._lock:
+        self._rebuilding = False
+        self._pending = []
+
+  def _record(self, method_name, argument):
+    if self._rebuilding:
+      self._pending.append((method_name, argument))
+
+  '''
+  upsert_mentor(mentor): adds a new mentor or moves the courses of an updated mentor to its new location
+  '''
+  def upsert_mentor(self, mentor):
+    with self._lock:
+      self._record('upsert_mentor', IndexedMentor(mentor.userid, mentor.city, mentor.state, mentor.avail_time, ()))
+      if self._built_at is None:
+        return
+      existing = self._mentors.get(mentor.userid)
+      course_ids = existing['course_ids'] if existing is not None else set()
+      removed = [self._remove_course(course_id) for course_id in list(course_ids)]
+      self._mentors[mentor.userid] = {
+        'location'      : self._location(mentor.city, mentor.state),
+        'time_available': mentor.avail_time,
+        'course_ids'    : set()
+      }
+      for key, entry in removed:
+        self._add_course(entry.course_id, mentor.userid, entry.course_name, key[2])
+
+  '''
+  remove_mentor(mentor_id): removes a deleted mentor along with all its courses
+  '''
+  def remove_mentor(self, mentor_id):
+    with self._lock:
+      self._record('remove_mentor', mentor_id)
+      mentor = self._mentors.pop(mentor_id, None)
+      if mentor is None:
+        return
+      for course_id in list(mentor['course_ids']):
+        self._remove_course(course_id)
+
+  '''
+  upsert_course(course): adds a new course or re-indexes an updated one
+  '''
+  def upsert_course(self, course):
+    with self._lock:
+      self._record('upsert_course', IndexedCourse(course.id, course.mentor_id, course.name, course.grade))
+      if self._built_at is None:
+        return
+      if course.id in self._courses:
+        self._remove_course(course.id)
+      if course.mentor_id not in self._mentors:
+        # the mentor was written by another process, the index can not place the course until it is rebuilt
+        self._built_at = None
+        return
+      self._add_course(course.id, course.mentor_id, course.name, course.grade)
+
+  '''
+  remove_course(course_id): removes a deleted course
+  '''
+  def remove_course(self, course_id):
+    with self._lock:
+      self._record('remove_course', course_id)
+      if course_id in self._courses:
+        self._remove_course(course_id)
+
+  '''
+  search(course_name, city, state, grade, after_course_id, limit): returns the matching entries ordered by course id,
+  starting after after_course_id and holding at most limit entries, or None if the index can not answer the query
+  '''
+  def search(self, course_name, city, state, grade, after_course_id=None, limit=None):
+    if not self.is_built():
+      return None
+    if not all(isinstance(value, str) for value in (course_name, city, state)):
+      return None
+    if '%' in course_name or '_' in course_name or '\\' in course_name:
+      return None
+    if isinstance(grade, (bool, float)):
+      return None
+    try:
+      grade = int(grade)
+    except (TypeError, ValueError):
+      return None
+
+    query = course_name.lower()
+    with self._lock:
+      bucket = self._buckets.get(self._location(city, state) + (grade,))
+      if bucket is None:
+        return []
+
+      query_trigrams = trigrams(query)
+      if query_trigrams:
+        posting_lists = sorted((bucket['trigrams'].get(trigram, set()) for trigram in query_trigrams), key=len)
+        candidates = set(posting_lists[0]).intersection(*posting_lists[1:])
+      else:
+        candidates = bucket['course_ids']
+
+      course_ids = sorted(course_id for course_id in candidates
+                          if (after_course_id is None or course_id > after_course_id) and query in self._courses[course_id][2])
+      if limit is not None:
+        course_ids = course_ids[:limit]
+      return [self._courses[course_id][1] for course_id in course_ids]
+
+
+## Index shared by all requests handled by this process
+mentor_search_index = MentorSearchIndex()
@@ -5,13 +5,34 @@ from flask_script import Manager
 from flask_migrate import Migrate, MigrateCommand
 
 from app import APP
-from database.models import db
+from database.models import db, Student, Mentor
 
 migrate = Migrate(APP, db)
 manager = Manager(APP)
 
 manager.add_command('db', MigrateCommand)
 
+GEOCODE_BATCH = 1000
+
+
+'''
+geocode: fills the coordinates of the students and mentors that have none from the bundled gazetteer,
+run it once after the migration that adds the coordinate columns: python manage.py geocode
+Rows of cities that are not listed in the gazetteer keep NULL coordinates.
+'''
+@manager.command
+def geocode():
+    for model in (Student, Mentor):
+        userids = [userid for userid, in db.session.query(model.userid).filter(model.latitude==None).order_by(model.userid)]
+        located = 0
+        for start in range(0, len(userids), GEOCODE_BATCH):
+            for row in model.query.filter(model.userid.in_(userids[start:start+GEOCODE_BATCH])).all():
+                row.locate()
+                if row.latitude is not None:
+                    located += 1
+            db.session.commit()
+        print('%s: geocoded %d of %d rows' % (model.__tablename__, located, len(userids)))
+
 
 if __name__ == '__main__':
     manager.run()
@@ -0,0 +1,30 @@
+"""indexes for the paged message inboxes
+
+Revision ID: 2c8e5b1f7d43
+Revises: f4a7c2d9e615
+Create Date: 2026-10-18 16:58:03.127640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8e5b1f7d43'
+down_revision = 'f4a7c2d9e615'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_request_messages_mentor_id_id', 'request_messages', ['mentor_id', sa.text('id DESC')], unique=False)
+    op.create_index('ix_request_messages_student_id_id', 'request_messages', ['student_id', sa.text('id DESC')], unique=False)
+    op.create_index('ix_reply_messages_student_id_id', 'reply_messages', ['student_id', sa.text('id DESC')], unique=False)
+    op.create_index('ix_reply_messages_mentor_id_id', 'reply_messages', ['mentor_id', sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_reply_messages_mentor_id_id', table_name='reply_messages')
+    op.drop_index('ix_reply_messages_student_id_id', table_name='reply_messages')
+    op.drop_index('ix_request_messages_student_id_id', table_name='request_messages')
+    op.drop_index('ix_request_messages_mentor_id_id', table_name='request_messages')
@@ -0,0 +1,31 @@
+"""course catalog with reference counts for GET /courses
+
+Revision ID: 3a9d4c6e8f12
+Revises: e2c5a8f3b7d0
+Create Date: 2026-10-18 14:31:09.375528
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a9d4c6e8f12'
+down_revision = 'e2c5a8f3b7d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('course_catalog',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('grade', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'grade')
+    )
+    # the session events in database/models.py keep the counts current from here on
+    op.execute('INSERT INTO course_catalog (name, grade, ref_count) SELECT name, grade, count(*) FROM mentor_courses GROUP BY name, grade')
+
+
+def downgrade():
+    op.drop_table('course_catalog')
@@ -0,0 +1,26 @@
+"""indexes for case-insensitive location search
+
+Revision ID: 5f2d7c81a4e6
+Revises: bc1a090e3e9a
+Create Date: 2026-10-18 10:03:52.117420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2d7c81a4e6'
+down_revision = 'bc1a090e3e9a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_mentors_lower_state_city', 'mentors', [sa.text('lower(state)'), sa.text('lower(city)')], unique=False)
+    op.create_index('ix_mentor_courses_mentor_id_grade', 'mentor_courses', ['mentor_id', 'grade'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_mentor_courses_mentor_id_grade', table_name='mentor_courses')
+    op.drop_index('ix_mentors_lower_state_city', table_name='mentors')
@@ -0,0 +1,37 @@
+"""weekly mentor availability intervals
+
+Revision ID: 7b3f90d2e41a
+Revises: d4e8a2b61c95
+Create Date: 2026-10-18 12:40:18.204736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3f90d2e41a'
+down_revision = 'd4e8a2b61c95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # mentors.avail_time stays as free text shown to students, structured intervals are entered with PUT /mentor_access/availability
+    op.create_table('mentor_availabilities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('mentor_id', sa.String(), nullable=False),
+    sa.Column('day_of_week', sa.Integer(), nullable=False),
+    sa.Column('start_minute', sa.Integer(), nullable=False),
+    sa.Column('end_minute', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['mentor_id'], ['mentors.userid'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_mentor_availabilities_day_start_end', 'mentor_availabilities', ['day_of_week', 'start_minute', 'end_minute'], unique=False)
+    op.create_index('ix_mentor_availabilities_mentor_id', 'mentor_availabilities', ['mentor_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_mentor_availabilities_mentor_id', table_name='mentor_availabilities')
+    op.drop_index('ix_mentor_availabilities_day_start_end', table_name='mentor_availabilities')
+    op.drop_table('mentor_availabilities')
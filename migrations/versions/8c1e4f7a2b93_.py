@@ -0,0 +1,25 @@
+"""mentor profile version for ETags
+
+Revision ID: 8c1e4f7a2b93
+Revises: 3a9d4c6e8f12
+Create Date: 2026-10-18 15:12:44.208316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1e4f7a2b93'
+down_revision = '3a9d4c6e8f12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing profiles start at version 1, the session events in database/models.py bump it on every change
+    op.add_column('mentors', sa.Column('version', sa.BigInteger(), server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('mentors', 'version')
@@ -0,0 +1,30 @@
+"""denormalized mentor rating sum and count
+
+Revision ID: b6d2f9e4c1a7
+Revises: 8c1e4f7a2b93
+Create Date: 2026-10-18 15:47:20.613094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f9e4c1a7'
+down_revision = '8c1e4f7a2b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('mentors', sa.Column('rating_sum', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('mentors', sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+    # the session events in database/models.py keep the totals current from here on
+    op.execute('UPDATE mentors SET rating_sum = totals.rating_sum, rating_count = totals.rating_count '
+               'FROM (SELECT mentor_id, sum(rating) AS rating_sum, count(*) AS rating_count FROM feedbacks GROUP BY mentor_id) AS totals '
+               'WHERE mentors.userid = totals.mentor_id')
+
+
+def downgrade():
+    op.drop_column('mentors', 'rating_count')
+    op.drop_column('mentors', 'rating_sum')
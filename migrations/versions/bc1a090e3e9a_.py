@@ -0,0 +1,27 @@
+"""trigram index for substring course name search
+
+Revision ID: bc1a090e3e9a
+Revises: 009531ff25e0
+Create Date: 2026-10-18 09:12:31.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bc1a090e3e9a'
+down_revision = '009531ff25e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # POST /student_access/search_mentors filters with lower(mentor_courses.name) LIKE '%...%'.
+    # A b-tree index can not serve a leading wildcard, a trigram GIN index on the same expression can.
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE INDEX ix_mentor_courses_lower_name_trgm ON mentor_courses USING gin (lower(name) gin_trgm_ops)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_mentor_courses_lower_name_trgm')
@@ -0,0 +1,36 @@
+"""geocoded coordinates and geohash cell for proximity search
+
+Revision ID: d4e8a2b61c95
+Revises: 5f2d7c81a4e6
+Create Date: 2026-10-18 11:24:07.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e8a2b61c95'
+down_revision = '5f2d7c81a4e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('students', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('students', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('mentors', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('mentors', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('mentors', sa.Column('geo_cell', sa.String(length=12), nullable=True))
+
+    # the existing rows are geocoded by the separate command: python manage.py geocode
+    op.create_index('ix_mentors_geo_cell', 'mentors', ['geo_cell'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_mentors_geo_cell', table_name='mentors')
+    op.drop_column('mentors', 'geo_cell')
+    op.drop_column('mentors', 'longitude')
+    op.drop_column('mentors', 'latitude')
+    op.drop_column('students', 'longitude')
+    op.drop_column('students', 'latitude')
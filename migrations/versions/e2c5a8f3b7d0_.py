@@ -0,0 +1,35 @@
+"""generated tsvector columns for full-text mentor search
+
+Revision ID: e2c5a8f3b7d0
+Revises: 7b3f90d2e41a
+Create Date: 2026-10-18 13:52:44.618203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c5a8f3b7d0'
+down_revision = '7b3f90d2e41a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Generated columns (Postgres 12+) are computed by the database on every insert and update, existing rows are filled in by the ALTER TABLE.
+    # Keep the expressions in sync with MENTOR_SEARCH_VECTOR and COURSE_SEARCH_VECTOR in database/models.py.
+    op.execute("ALTER TABLE mentors ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+               "setweight(to_tsvector('english', coalesce(qualification, '')), 'B') || "
+               "setweight(to_tsvector('english', coalesce(add_qualification, '')), 'C')) STORED")
+    op.execute("ALTER TABLE mentor_courses ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+               "setweight(to_tsvector('english', coalesce(name, '')), 'A')) STORED")
+    op.create_index('ix_mentors_search_vector', 'mentors', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_mentor_courses_search_vector', 'mentor_courses', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_mentor_courses_search_vector', table_name='mentor_courses')
+    op.drop_index('ix_mentors_search_vector', table_name='mentors')
+    op.drop_column('mentor_courses', 'search_vector')
+    op.drop_column('mentors', 'search_vector')
@@ -0,0 +1,26 @@
+"""indexes for the paged sections of the mentor dashboard
+
+Revision ID: f4a7c2d9e615
+Revises: b6d2f9e4c1a7
+Create Date: 2026-10-18 16:20:51.884472
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a7c2d9e615'
+down_revision = 'b6d2f9e4c1a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_feedbacks_mentor_id_id', 'feedbacks', ['mentor_id', 'id'], unique=False)
+    op.create_index('ix_mentor_student_pairs_mentor_id_present_student_id', 'mentor_student_pairs', ['mentor_id', 'present_student', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_mentor_student_pairs_mentor_id_present_student_id', table_name='mentor_student_pairs')
+    op.drop_index('ix_feedbacks_mentor_id_id', table_name='feedbacks')
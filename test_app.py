@@ -2,9 +2,12 @@ import os
 import unittest
 import json
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
 
 from app import create_app
 from database.models import setup_db, Student, Mentor, MentorCourse, MentorStudentPair, Feedback, RequestMessage, ReplyMessage, AdminMessage
+from auth_0.auth import use_local_issuer
+from auth_0.local_issuer import LocalTokenIssuer
 
 
 
@@ -17,6 +20,16 @@ JWT_ADMIN = os.getenv('JWT_ADMIN')
 TEST_DB_NAME = os.getenv('TEST_DB_NAME')
 TEST_DB_PATH=os.getenv('TEST_DB_PATH')
 
+"""
+Without JWTs in the environment the tests run offline with tokens minted by a local issuer
+"""
+if not (JWT_STUDENT and JWT_MENTOR and JWT_ADMIN):
+    LOCAL_ISSUER = LocalTokenIssuer()
+    use_local_issuer(LOCAL_ISSUER)
+    JWT_STUDENT = LOCAL_ISSUER.mint_token('student_1', ['delete:student', 'post:student', 'read:student', 'update:student'])
+    JWT_MENTOR = LOCAL_ISSUER.mint_token('mentor_1', ['delete:mentor', 'post:mentor', 'read:mentor', 'update:mentor'])
+    JWT_ADMIN = LOCAL_ISSUER.mint_token('admin', ['delete:admin', 'delete:mentor', 'delete:student', 'read:admin', 'read:mentor', 'read:student'])
+
 
 class CapstoneTestCase(unittest.TestCase):
     """This class represents the capstone test case"""
@@ -262,6 +275,55 @@ class CapstoneTestCase(unittest.TestCase):
         assert data['rating'] is not None
         pass
 
+    def test11_304_get_mentor_access(self):
+        res = self.client().get(
+                             '/mentor_access',
+                             headers = [
+                                         ('Authorization', f'Bearer {JWT_MENTOR}')
+                                     ]
+                                )
+        self.assertEqual(res.status_code, 200)
+        etag = res.headers['ETag']
+        res = self.client().get(
+                             '/mentor_access',
+                             headers = [
+                                         ('Authorization', f'Bearer {JWT_MENTOR}'),
+                                         ('If-None-Match', etag)
+                                     ]
+                                )
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.headers['ETag'], etag)
+        pass
+
+
+    def test11_200_get_mentor_access_paged(self):
+        res = self.client().get(
+                             '/mentor_access?feedbacks_limit=1&current_students_limit=1&previous_students_limit=1',
+                             headers = [
+                                         ('Authorization', f'Bearer {JWT_MENTOR}')
+                                     ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertLessEqual(len(data['feedbacks']), 1)
+        self.assertLessEqual(len(data['current_students']), 1)
+        self.assertLessEqual(len(data['previous_students']), 1)
+        assert 'feedbacks_next_cursor' in data
+        pass
+
+    def test11_400_get_mentor_access_paged(self):
+        res = self.client().get(
+                             '/mentor_access?feedbacks_limit=0',
+                             headers = [
+                                         ('Authorization', f'Bearer {JWT_MENTOR}')
+                                     ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(data['success'],False)
+        self.assertEqual(data['error'],400)
+        pass
+
 
     def test12_403_get_mentor_access(self):
         res = self.client().get(
@@ -362,6 +424,47 @@ class CapstoneTestCase(unittest.TestCase):
         pass  
     
 
+    def test18_200_get_courses_includes_new_course(self):
+        res = self.client().get('/courses')
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertIn(["new_course_1", 6], data['courses'])
+        pass
+
+    def test18_200_put_mentor_access_availability(self):
+        res = self.client().put(
+                                '/mentor_access/availability',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_MENTOR}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "availability": ["Tue 14:00-16:00", "Tue 16:00-18:00", "Fri 22:00-01:00"]
+                                       }
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertEqual(data['availability'],["Tue 14:00-18:00", "Fri 22:00-24:00", "Sat 00:00-01:00"])
+        pass 
+
+    def test18_400_put_mentor_access_availability(self):
+        res = self.client().put(
+                                '/mentor_access/availability',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_MENTOR}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "availability": ["Someday 14:00-16:00"]
+                                       }
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(data['success'],False)
+        self.assertEqual(data['error'],400)
+        pass
+
     def test19_200_post_mentor_access_accept_student(self): 
         res = self.client().post(
                                 '/mentor_access/accept_student',
@@ -415,6 +518,23 @@ class CapstoneTestCase(unittest.TestCase):
         pass 
 
 
+    def test22_200_get_student_access_previous_courses(self):
+        res = self.client().get(
+                             '/student_access',
+                             headers = [
+                                         ('Authorization', f'Bearer {JWT_STUDENT}')
+                                     ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertGreater(len(data['previous_courses']), 0)
+        for previous_course in data['previous_courses']:
+            self.assertIn('mentor_name', previous_course)
+            self.assertIn('course_name', previous_course)
+            self.assertIn('grade', previous_course)
+        pass
+
     def test22_400_patch_mentor_access_accepted_student_update(self): 
         res = self.client().patch(
                                 '/mentor_access/accepted_student_update',
@@ -441,6 +561,18 @@ class CapstoneTestCase(unittest.TestCase):
         assert data['request_messages'] is not None       
         pass
 
+    def test23_400_get_mentor_access_request_messages_paged(self):
+        res = self.client().get(
+                                '/mentor_access/request_messages?before_id=latest',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_MENTOR}')
+                                   ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(data['success'],False)
+        self.assertEqual(data['error'],400)
+        pass
+
     def test24_401_get_mentor_access_request_messages(self):
         res = self.client().get( '/mentor_access/request_messages')        
         data=json.loads(res.data)
@@ -531,6 +663,162 @@ class CapstoneTestCase(unittest.TestCase):
 
     
 
+    def test31_200_post_student_access_search_mentors_paginated(self):
+        res = self.client().post(
+                                '/student_access/search_mentors',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "course_name" : "course",
+                                           "grade" : 6,
+                                           "city" : "Fremont",
+                                           "state" : "CA",
+                                           "limit" : 1
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertEqual(len(data['search_output']),1)
+        assert 'next_cursor' in data
+        pass 
+
+
+    def test31_200_post_student_access_search_mentors_by_rating(self):
+        res = self.client().post(
+                                '/student_access/search_mentors',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "course_name" : "course",
+                                           "grade" : 5,
+                                           "city" : "Fremont",
+                                           "state" : "CA",
+                                           "sort_by" : "rating"
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        ratings = [mentor['rating'] for mentor in data['search_output']]
+        self.assertEqual(ratings, sorted(ratings, reverse=True))
+        for mentor in data['search_output']:
+            assert 'review_count' in mentor
+        pass 
+
+
+    def test31_200_post_student_access_search_mentors_available(self):
+        res = self.client().post(
+                                '/student_access/search_mentors',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "course_name" : "course",
+                                           "grade" : 6,
+                                           "city" : "Fremont",
+                                           "state" : "CA",
+                                           "available" : "Tue 15:00-17:00"
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertEqual(len(data['search_output']),1)
+        pass 
+
+
+    def test31_200_post_student_access_search_mentors_text(self):
+        res = self.client().post(
+                                '/student_access/search_mentors',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "course_name" : "additional qualifications",
+                                           "grade" : 6,
+                                           "city" : "Fremont",
+                                           "state" : "CA",
+                                           "search_mode" : "text"
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertEqual(len(data['search_output']),1)
+        pass 
+
+
+    def test31_400_post_student_access_search_mentors_bad_cursor(self):
+        res = self.client().post(
+                                '/student_access/search_mentors',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "course_name" : "course",
+                                           "grade" : 6,
+                                           "city" : "Fremont",
+                                           "state" : "CA",
+                                           "cursor" : "not a cursor"
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(data['success'],False)
+        self.assertEqual(data['error'],400)
+        pass 
+
+
+    def test31_200_post_student_access_search_mentors_batch(self):
+        res = self.client().post(
+                                '/student_access/search_mentors_batch',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "city" : "Fremont",
+                                           "state" : "CA",
+                                           "queries" : [
+                                                          {"course_name" : "course", "grade" : 6},
+                                                          {"course_name" : "no such course", "grade" : 6}
+                                                       ]
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertEqual(len(data['search_results']),2)
+        self.assertEqual(data['search_results'][1]['search_output'],[])
+        pass 
+
+
+    def test31_400_post_student_access_search_mentors_batch_no_queries(self):
+        res = self.client().post(
+                                '/student_access/search_mentors_batch',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "city" : "Fremont",
+                                           "state" : "CA",
+                                           "queries" : []
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(data['success'],False)
+        self.assertEqual(data['error'],400)
+        pass
+
+
     def test32_400_post_student_access_search_mentors(self):
         res = self.client().post(
                                 '/student_access/search_mentors',
@@ -545,6 +833,49 @@ class CapstoneTestCase(unittest.TestCase):
         pass
 
 
+    def test32_200_post_student_access_search_mentors_nearby(self):
+        res = self.client().post(
+                                '/student_access/search_mentors_nearby',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "course_name" : "course",
+                                           "grade" : 5,
+                                           "radius_km" : 50
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        distances = [mentor['distance_km'] for mentor in data['search_output']]
+        self.assertEqual(distances, sorted(distances))
+        pass 
+
+
+    def test32_200_post_student_access_search_mentors_nearby_unknown_city(self):
+        res = self.client().post(
+                                '/student_access/search_mentors_nearby',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "course_name" : "course",
+                                           "grade" : 5,
+                                           "city" : "Not A City",
+                                           "state" : "CA"
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        for search_output in data['search_output']:
+            self.assertIsNone(search_output['distance_km'])
+        pass
+
+
     def test33_200_get_student_access_mentors(self):
         res = self.client().get(
                                 '/student_access/mentors/mentor_1',
@@ -559,6 +890,24 @@ class CapstoneTestCase(unittest.TestCase):
         assert data['mentor_details'] is not None
         pass 
 
+    def test33_304_get_student_access_mentors(self):
+        res = self.client().get(
+                                '/student_access/mentors/mentor_1',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}')
+                                   ]
+                                )
+        self.assertEqual(res.status_code, 200)
+        res = self.client().get(
+                                '/student_access/mentors/mentor_1',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('If-None-Match', res.headers['ETag'])
+                                   ]
+                                )
+        self.assertEqual(res.status_code, 304)
+        pass 
+
     def test34_404_get_student_access_mentors(self):
         res = self.client().get(
                                 '/student_access/mentors/mentor_20',
@@ -623,6 +972,42 @@ class CapstoneTestCase(unittest.TestCase):
         assert data['reply_messages'] is not None
         pass 
 
+    def test37_200_get_student_access_reply_messages_paged(self):
+        res = self.client().get(
+                                '/student_access/reply_messages?limit=1',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}')
+                                   ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertLessEqual(len(data['reply_messages']), 1)
+        assert 'next_before_id' in data
+        pass
+
+    def test37_200_get_student_access_reply_messages_since(self):
+        res = self.client().get(
+                                '/student_access/reply_messages',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}')
+                                   ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        res = self.client().get(
+                                f"/student_access/reply_messages?since_id={data['high_water_mark']}",
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}')
+                                   ]
+                                )
+        data_since=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data_since['reply_messages'], [])
+        self.assertEqual(data_since['high_water_mark'], data['high_water_mark'])
+        self.assertEqual(data_since['has_more'], False)
+        pass
+
     def test38_401_get_student_access_reply_messages(self):
         res = self.client().get(
                                 '/student_access/reply_messages'
@@ -651,6 +1036,77 @@ class CapstoneTestCase(unittest.TestCase):
         pass    
 
 
+    def test39_200_post_student_access_mentor_ratings(self):
+        res = self.client().post(
+                                '/student_access/mentor_ratings',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "mentor_ids" : ["mentor_1", "no_such_mentor"]
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        self.assertEqual(list(data['ratings'].keys()), ["mentor_1"])
+        self.assertGreater(data['ratings']["mentor_1"][1], 0)
+        pass
+
+    def test39_400_post_student_access_mentor_ratings(self):
+        res = self.client().post(
+                                '/student_access/mentor_ratings',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                           "mentor_ids" : []
+                                        }   
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(data['success'],False)
+        self.assertEqual(data['error'],400)
+        pass
+
+    def test40_200_get_mentor_access_rating_after_feedback(self):
+        res = self.client().get(
+                             '/mentor_access',
+                             headers = [
+                                         ('Authorization', f'Bearer {JWT_MENTOR}')
+                                     ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        ratings = [feedback['rating'] for feedback in data['feedbacks']]
+        self.assertGreater(len(ratings), 0)
+        self.assertAlmostEqual(data['rating'], sum(ratings) / len(ratings))
+        pass
+
+    def test40_400_post_student_access_feedback_fractional_rating(self):
+        res = self.client().post(
+                                '/student_access/feedback',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}'),
+                                           ('Content-Type', 'application/json')
+                                   ],
+                                json = {
+                                          "mentor_id": "mentor_1",
+                                          "message": "feedback Message 2",
+                                          "rating": 4.7
+                                       } 
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data['success'],False)
+        with self.app.app_context():
+            mentor = Mentor.query.filter(Mentor.userid=='mentor_1').one()
+            feedback_totals = Feedback.query.with_entities(func.coalesce(func.sum(Feedback.rating), 0), func.count(Feedback.id)).filter(Feedback.mentor_id=='mentor_1').one()
+            self.assertEqual(mentor.rating_sum, feedback_totals[0])
+            self.assertEqual(mentor.rating_count, feedback_totals[1])
+        pass
+
     def test40_400_post_student_access_feedback(self):
         res = self.client().post(
                                 '/student_access/feedback',
@@ -875,6 +1331,36 @@ class CapstoneTestCase(unittest.TestCase):
         pass 
 
 
+    ## AUTH METRICS
+
+    def test56_200_get_admin_access_auth_metrics(self):
+        res = self.client().get(
+                                '/admin_access/auth_metrics',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_ADMIN}')
+                                   ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'],True)
+        assert data['auth_metrics']['timings']['read:admin'] is not None
+        assert data['auth_metrics']['token_cache'] is not None
+        pass
+
+
+    def test57_403_get_admin_access_auth_metrics(self):
+        res = self.client().get(
+                                '/admin_access/auth_metrics',
+                                headers = [
+                                           ('Authorization', f'Bearer {JWT_STUDENT}')
+                                   ]
+                                )
+        data=json.loads(res.data)
+        self.assertEqual(res.status_code, 403)
+        self.assertEqual(data['code'],"access_denied")
+        pass
+
+
     ## DELETE mentor and student
 
     def test94_200_delete_course_mentor_access(self):
@@ -0,0 +1,250 @@
+import time
+import unittest
+import rsa
+from jose import jwt
+from jose.utils import long_to_base64
+
+from auth_0.jwks import JWKSKeyStore, JWKSUnavailableError
+from auth_0.token_cache import TokenCache
+from auth_0.local_issuer import LocalTokenIssuer
+from auth_0.metrics import AuthTimings
+from auth_0 import auth
+from auth_0.auth import AuthError, verify_decode_jwt, check_permissions, get_user_identity, use_local_issuer, parse_algorithms, verify_signature
+
+
+"""
+Tests for the authentication helpers that do not need a database or live Auth0 tokens
+"""
+def make_jwk(kid):
+    public_key, private_key = rsa.newkeys(512)
+    return {
+        'kid': kid,
+        'kty': 'RSA',
+        'use': 'sig',
+        'n'  : long_to_base64(public_key.n).decode('ascii'),
+        'e'  : long_to_base64(public_key.e).decode('ascii')
+    }
+
+
+class JWKSKeyStoreTestCase(unittest.TestCase):
+    """This class represents the jwks key store test case"""
+
+    def setUp(self):
+        """Define a jwks document served by a counting fetch method"""
+        self.fetch_count = 0
+        self.jwks = {'keys': [make_jwk('key_1')]}
+        self.provider_down = False
+
+        def fetch(jwks_url):
+            self.fetch_count += 1
+            if self.provider_down:
+                raise IOError('identity provider unreachable')
+            return self.jwks
+
+        self.fetch = fetch
+
+    def tearDown(self):
+        """Executed after each test"""
+        pass
+
+    def test_key_is_fetched_once_within_ttl(self):
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=600, fetch=self.fetch)
+        self.assertIsNotNone(store.get_key('key_1'))
+        self.assertIsNotNone(store.get_key('key_1'))
+        self.assertEqual(self.fetch_count, 1)
+        pass
+
+    def test_key_set_is_fetched_again_after_ttl(self):
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=0, fetch=self.fetch)
+        store.get_key('key_1')
+        store.get_key('key_1')
+        self.assertEqual(self.fetch_count, 2)
+        pass
+
+    def test_unknown_kid_forces_refresh(self):
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=600, fetch=self.fetch)
+        store.get_key('key_1')
+        self.jwks = {'keys': [make_jwk('key_2')]}
+        self.assertIsNotNone(store.get_key('key_2'))
+        self.assertEqual(self.fetch_count, 2)
+        pass
+
+    def test_key_object_is_reused_across_refreshes(self):
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=0, fetch=self.fetch)
+        key = store.get_key('key_1')
+        self.assertIs(store.get_key('key_1'), key)
+        self.jwks = {'keys': [make_jwk('key_1')]}
+        self.assertIsNot(store.get_key('key_1'), key)
+        pass
+
+    def test_unusable_key_is_skipped(self):
+        self.jwks = {'keys': [{'kid': 'key_1', 'kty': 'RSA', 'use': 'sig', 'n': '!', 'e': '!'}]}
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=600, fetch=self.fetch)
+        self.assertIsNone(store.get_key('key_1'))
+        pass
+
+    def test_forced_refresh_is_rate_limited(self):
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=600, min_refresh_interval=60, fetch=self.fetch)
+        store.get_key('key_1')
+        self.assertIsNone(store.get_key('unknown_1'))
+        self.assertIsNone(store.get_key('unknown_2'))
+        self.assertEqual(self.fetch_count, 2)
+        pass
+
+
+    def test_stale_key_set_is_served_while_refresh_fails(self):
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=0, fetch=self.fetch)
+        key = store.get_key('key_1')
+        self.provider_down = True
+        self.assertIs(store.get_key('key_1'), key)
+        self.assertEqual(store.consecutive_failures, 1)
+        pass
+
+    def test_circuit_opens_after_repeated_failures(self):
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=0, fetch=self.fetch, failure_threshold=2, cooldown=60)
+        store.get_key('key_1')
+        self.provider_down = True
+        store.get_key('key_1')
+        store.get_key('key_1')
+        self.assertTrue(store.is_circuit_open())
+        store.get_key('key_1')
+        self.assertEqual(self.fetch_count, 3)
+        pass
+
+    def test_unavailable_error_without_any_key_set(self):
+        self.provider_down = True
+        store = JWKSKeyStore('https://example.com/.well-known/jwks.json', ttl=600, fetch=self.fetch)
+        self.assertRaises(JWKSUnavailableError, store.get_key, 'key_1')
+        pass
+
+
+class TokenCacheTestCase(unittest.TestCase):
+    """This class represents the verified token cache test case"""
+
+    def setUp(self):
+        """Define a payload that expires in an hour"""
+        self.payload = {'permissions': ['read:student'], 'exp': time.time() + 3600}
+
+    def tearDown(self):
+        """Executed after each test"""
+        pass
+
+    def test_hit_after_put(self):
+        cache = TokenCache(maxsize=10)
+        self.assertIsNone(cache.get('token_1'))
+        cache.put('token_1', self.payload)
+        self.assertEqual(cache.get('token_1'), self.payload)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 1})
+        pass
+
+    def test_expired_token_is_evicted(self):
+        cache = TokenCache(maxsize=10)
+        cache.put('token_1', {'permissions': [], 'exp': time.time() - 1})
+        self.assertIsNone(cache.get('token_1'))
+        self.assertEqual(cache.stats()['size'], 0)
+        pass
+
+    def test_token_without_exp_is_not_cached(self):
+        cache = TokenCache(maxsize=10)
+        cache.put('token_1', {'permissions': []})
+        self.assertIsNone(cache.get('token_1'))
+        pass
+
+    def test_least_recently_used_token_is_evicted(self):
+        cache = TokenCache(maxsize=2)
+        cache.put('token_1', self.payload)
+        cache.put('token_2', self.payload)
+        cache.get('token_1')
+        cache.put('token_3', self.payload)
+        self.assertIsNone(cache.get('token_2'))
+        self.assertIsNotNone(cache.get('token_1'))
+        self.assertIsNotNone(cache.get('token_3'))
+        pass
+
+
+class LocalIssuerTestCase(unittest.TestCase):
+    """This class represents the offline token verification test case"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Define one local issuer for all tests, generating a key pair is slow"""
+        cls.issuer = LocalTokenIssuer(key_size=1024)
+
+    def setUp(self):
+        """Verify tokens against the local issuer"""
+        use_local_issuer(self.issuer)
+
+    def tearDown(self):
+        """Executed after each test"""
+        pass
+
+    def test_minted_token_is_verified(self):
+        token = self.issuer.mint_token('student_1', ['read:student'])
+        payload = verify_decode_jwt(token)
+        self.assertTrue(check_permissions('read:student', payload))
+        self.assertEqual(get_user_identity(payload), 'student_1')
+        pass
+
+    def test_missing_permission_is_denied(self):
+        payload = verify_decode_jwt(self.issuer.mint_token('student_1', ['read:student']))
+        with self.assertRaises(AuthError) as context:
+            check_permissions('read:mentor', payload)
+        self.assertEqual(context.exception.status_code, 403)
+        pass
+
+    def test_expired_token_is_rejected(self):
+        with self.assertRaises(AuthError) as context:
+            verify_decode_jwt(self.issuer.mint_token('student_1', ['read:student'], expires_in=-10))
+        self.assertEqual(context.exception.error['code'], 'expired_signature')
+        pass
+
+    def test_token_from_other_issuer_is_rejected(self):
+        other_issuer = LocalTokenIssuer(key_size=1024)
+        with self.assertRaises(AuthError) as context:
+            verify_decode_jwt(other_issuer.mint_token('student_1', ['read:student']))
+        self.assertEqual(context.exception.status_code, 400)
+        pass
+
+    def test_algorithm_must_be_listed_exactly(self):
+        self.assertEqual(parse_algorithms("['RS256']"), ['RS256'])
+        self.assertEqual(parse_algorithms('[RS256]'), ['RS256'])
+        self.assertEqual(parse_algorithms('RS256, RS384'), ['RS256', 'RS384'])
+        self.assertIsNone(parse_algorithms(None))
+        algorithms = auth.ALGORITHMS
+        auth.ALGORITHMS = parse_algorithms('[RS256]')
+        try:
+            with self.assertRaises(jwt.JWTError):
+                verify_signature(self.issuer.mint_token('student_1', ['read:student']), None, 'RS2')
+        finally:
+            auth.ALGORITHMS = algorithms
+        pass
+
+
+class AuthTimingsTestCase(unittest.TestCase):
+    """This class represents the auth timing metrics test case"""
+
+    def setUp(self):
+        """Executed before each test"""
+        pass
+
+    def tearDown(self):
+        """Executed after each test"""
+        pass
+
+    def test_stages_are_recorded_per_permission(self):
+        timings = AuthTimings()
+        timer = timings.timer('read:student')
+        with timer.stage('header'):
+            pass
+        timings.record('read:student', 'signature', 0.002)
+        timings.record('read:mentor', 'signature', 5)
+        formatted = timings.format()
+        self.assertEqual(formatted['read:student']['header']['count'], 1)
+        self.assertIn([2.5, 1], formatted['read:student']['signature']['buckets'])
+        self.assertEqual(formatted['read:mentor']['signature']['buckets'][-1], [None, 1])
+        pass
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import random
+import unittest
+
+from database.geo import geocode, geohash_encode, covering_cells, distance_km, locate
+
+
+"""
+Tests for the geocoding and geohash helpers of the proximity search
+"""
+class GeoTestCase(unittest.TestCase):
+    """This class represents the geo helpers test case"""
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_geocode_matches_state_code_and_name(self):
+        self.assertEqual(geocode('fremont', 'CA'), geocode('Fremont ', 'California'))
+        self.assertIsNone(geocode('Atlantis', 'CA'))
+        self.assertEqual(locate('Atlantis', 'CA'), (None, None, None))
+
+    def test_geohash_encode(self):
+        self.assertEqual(geohash_encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geohash_encode(37.5485, -121.9886), '9q9m')
+
+    def test_distance_km(self):
+        fremont = geocode('Fremont', 'CA')
+        san_jose = geocode('San Jose', 'CA')
+        self.assertAlmostEqual(distance_km(fremont[0], fremont[1], san_jose[0], san_jose[1]), 25.1, delta=0.5)
+
+    def test_covering_cells_contain_every_point_of_the_circle(self):
+        generator = random.Random(7)
+        for _ in range(200):
+            latitude, longitude = generator.uniform(-80, 80), generator.uniform(-180, 180)
+            radius_km = generator.uniform(1, 100)
+            cells = covering_cells(latitude, longitude, radius_km)
+            for _ in range(20):
+                point = (latitude + generator.uniform(-1, 1), longitude + generator.uniform(-1.5, 1.5))
+                point = (point[0], (point[1] + 180) % 360 - 180)
+                if distance_km(latitude, longitude, point[0], point[1]) <= radius_km:
+                    self.assertIn(geohash_encode(point[0], point[1]), cells)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -3,5 +3,8 @@ createdb capstone_test
 export TEST_DB_NAME="capstone_test"
 export TEST_DB_PATH="username:password@localhost:5432"
 python test_app.py
+python test_auth.py
+python test_search_index.py
+python test_geo.py
 dropdb capstone_test
 
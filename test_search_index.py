@@ -0,0 +1,152 @@
+import threading
+import unittest
+from collections import namedtuple
+
+from database.search_index import MentorSearchIndex
+from database.search_cache import SearchResultCache
+from database.availability import parse_slot, parse_availability, format_slot
+
+
+"""
+Tests for the in-memory mentor search index, the search result cache and the time slot filter, they are fed plain objects so no database is needed
+"""
+FakeMentor = namedtuple('FakeMentor', ['userid', 'city', 'state', 'avail_time', 'offer_courses'])
+FakeCourse = namedtuple('FakeCourse', ['id', 'mentor_id', 'name', 'grade'])
+
+
+class MentorSearchIndexTestCase(unittest.TestCase):
+    """This class represents the mentor search index test case"""
+
+    def setUp(self):
+        self.index = MentorSearchIndex(enabled=True, max_age=60)
+        self.index.build([
+            FakeMentor('mentor_1', 'Fremont', 'CA', 'weekends', [FakeCourse(1, 'mentor_1', 'Algebra', 5), FakeCourse(2, 'mentor_1', 'Biology', 5)]),
+            FakeMentor('mentor_2', 'fremont', 'ca', 'evenings', [FakeCourse(3, 'mentor_2', 'Pre-Algebra', 5), FakeCourse(4, 'mentor_2', 'Algebra', 6)])
+        ])
+
+    def tearDown(self):
+        pass
+
+    def test_search_matches_substring_case_insensitive(self):
+        entries = self.index.search('ALG', 'FREMONT', 'ca', 5)
+
+        self.assertEqual([entry.course_id for entry in entries], [1, 3])
+        self.assertEqual(entries[1].time_available, 'evenings')
+
+    def test_search_pages_by_course_id(self):
+        self.assertEqual([entry.course_id for entry in self.index.search('l', 'fremont', 'CA', 5, limit=2)], [1, 2])
+        self.assertEqual([entry.course_id for entry in self.index.search('l', 'fremont', 'CA', 5, after_course_id=2)], [3])
+
+    def test_search_falls_back_for_wildcards_and_stale_index(self):
+        self.assertIsNone(self.index.search('alg%', 'fremont', 'CA', 5))
+        self.assertIsNone(self.index.search('alg\\', 'fremont', 'CA', 5))
+        self.assertIsNone(self.index.search('alg', 'fremont', 'CA', 'five'))
+        self.assertIsNone(self.index.search('alg', 'fremont', 'CA', 5.5))
+        self.index.clear()
+        self.assertIsNone(self.index.search('alg', 'fremont', 'CA', 5))
+
+    def test_writes_update_index(self):
+        self.index.upsert_mentor(FakeMentor('mentor_2', 'Austin', 'TX', 'mornings', []))
+        self.index.upsert_course(FakeCourse(5, 'mentor_1', 'Linear Algebra', 5))
+        self.index.remove_course(1)
+
+        self.assertEqual([entry.course_id for entry in self.index.search('alg', 'fremont', 'ca', 5)], [5])
+        self.assertEqual([entry.time_available for entry in self.index.search('alg', 'austin', 'tx', 5)], ['mornings'])
+
+        self.index.remove_mentor('mentor_2')
+        self.assertEqual(self.index.search('alg', 'austin', 'tx', 5), [])
+
+    def test_single_background_rebuild_keeps_serving_and_replays_writes(self):
+        loading = threading.Event()
+        release = threading.Event()
+        loads = []
+        def load():
+            loads.append(1)
+            loading.set()
+            release.wait(5)
+            return [FakeMentor('mentor_3', 'Austin', 'TX', 'mornings', [FakeCourse(7, 'mentor_3', 'Geometry', 5)])]
+
+        self.assertTrue(self.index.rebuild_in_background(load))
+        self.assertTrue(loading.wait(5))
+        self.assertFalse(self.index.rebuild_in_background(load))
+        self.assertEqual([entry.course_id for entry in self.index.search('alg', 'fremont', 'ca', 5)], [1, 3])
+        self.index.upsert_course(FakeCourse(8, 'mentor_3', 'Algebra II', 5))
+        release.set()
+        for _ in range(500):
+            if not self.index._rebuilding:
+                break
+            threading.Event().wait(0.01)
+
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(self.index.search('alg', 'fremont', 'ca', 5), [])
+        self.assertEqual([entry.course_id for entry in self.index.search('', 'austin', 'tx', 5)], [7, 8])
+
+
+
+class SearchResultCacheTestCase(unittest.TestCase):
+    """This class represents the search result cache test case"""
+
+    def setUp(self):
+        self.cache = SearchResultCache(maxsize=2, ttl=60)
+
+    def tearDown(self):
+        pass
+
+    def test_keys_are_normalized(self):
+        key = self.cache.make_key('course_id', 'Algebra', 'Fremont', 'CA', '5', None, 50)
+
+        self.assertEqual(key, self.cache.make_key('course_id', 'ALGEBRA', 'fremont', 'ca', 5, None, 50))
+        self.assertIsNone(self.cache.make_key('course_id', 'Algebra', 'Fremont', 'CA', 5.5, None, 50))
+        self.assertIsNone(self.cache.make_key('course_id', ['Algebra'], 'Fremont', 'CA', 5, None, 50))
+
+    def test_invalidate_drops_matching_location_and_grade_only(self):
+        fremont = self.cache.make_key('course_id', 'alg', 'Fremont', 'CA', 5, None, 50)
+        austin = self.cache.make_key('course_id', 'alg', 'Austin', 'TX', 6, None, 50)
+        self.cache.put(fremont, ('fremont', None), self.cache.generation)
+        self.cache.put(austin, ('austin', None), self.cache.generation)
+
+        self.cache.invalidate(locations=[('ca', 'fremont')])
+        self.assertIsNone(self.cache.get(fremont))
+        self.assertEqual(self.cache.get(austin), ('austin', None))
+
+        self.cache.invalidate(grades=[6])
+        self.assertIsNone(self.cache.get(austin))
+
+    def test_put_is_skipped_after_concurrent_invalidation(self):
+        key = self.cache.make_key('course_id', 'alg', 'Fremont', 'CA', 5, None, 50)
+        generation = self.cache.generation
+        self.cache.invalidate(grades=[9])
+        self.cache.put(key, ('stale', None), generation)
+
+        self.assertIsNone(self.cache.get(key))
+
+    def test_least_recently_used_is_evicted(self):
+        keys = [self.cache.make_key('course_id', name, 'Fremont', 'CA', 5, None, 50) for name in ('a', 'b', 'c')]
+        self.cache.put(keys[0], ('a', None), self.cache.generation)
+        self.cache.put(keys[1], ('b', None), self.cache.generation)
+        self.cache.get(keys[0])
+        self.cache.put(keys[2], ('c', None), self.cache.generation)
+
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertEqual(self.cache.stats()['size'], 2)
+
+
+class AvailabilityTestCase(unittest.TestCase):
+    """This class represents the weekly availability helpers test case"""
+
+    def test_parse_slot(self):
+        self.assertEqual(parse_slot('Tue 16:00-18:00'), (1, 960, 1080))
+        self.assertEqual(parse_slot('sunday 9:30 - 24:00'), (6, 570, 1440))
+        for slot in ('Someday 16:00-18:00', 'Tue 16:00', 'Tue 16:60-18:00', 'Tue 10:00-10:00', 5):
+            with self.assertRaises(ValueError):
+                parse_slot(slot)
+
+    def test_parse_availability_splits_and_merges(self):
+        intervals = parse_availability(['Sun 23:00-01:00', 'Tue 09:00-12:00', 'Tue 11:00-13:00', 'Tue 13:00-14:00'])
+
+        self.assertEqual(intervals, [(0, 0, 60), (1, 540, 840), (6, 1380, 1440)])
+        self.assertEqual([format_slot(*interval) for interval in intervals], ['Mon 00:00-01:00', 'Tue 09:00-14:00', 'Sun 23:00-24:00'])
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()